@@ -1,22 +1,258 @@
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import asyncio
+import hashlib
+import io
 import json
-import time
 import re
+import time
+from collections import deque
+from pathlib import Path
+import httpx
+import ijson
+import orjson
 from rich.console import Console
-from openai import OpenAI
+from openai import AsyncOpenAI, APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+from tenacity import retry, retry_if_exception, stop_after_attempt, stop_after_delay, wait_exponential_jitter
 
 # Optional Google Import
 try:
     import google.generativeai as genai
+    from google.api_core import exceptions as google_exceptions
     HAS_GOOGLE = True
 except ImportError:
     HAS_GOOGLE = False
 
 console = Console()
 
+# Hard per-request timeout for one chunk, scaled by the chunks bundled into a
+# request; a timeout advances to the next model in the chain
+REQUEST_TIMEOUT_SEC = float(os.getenv("AI_REQUEST_TIMEOUT", "15"))
+
+# Characters that can change bracket depth or string state
+_JSON_STRUCTURAL_RE = re.compile(r'["\\\[\]{}]')
+
+def _balanced_end(text: str, start: int) -> Optional[int]:
+    """
+    Given the index of an opening '[' or '{', returns the index of its matching
+    closing bracket, ignoring brackets inside string literals. None if the
+    value is not closed (yet). The regex only jumps between structural
+    characters, so ordinary text is skipped in C rather than per character.
+    """
+    depth = 0
+    in_string = False
+    escaped_pos = -1
+    for match in _JSON_STRUCTURAL_RE.finditer(text, start):
+        pos = match.start()
+        if pos == escaped_pos:
+            continue
+        ch = text[pos]
+        if in_string:
+            if ch == '\\':
+                escaped_pos = pos + 1
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in '[{':
+            depth += 1
+        elif ch in ']}':
+            depth -= 1
+            if depth == 0:
+                return pos
+    return None
+
+def _extract_json_array(text: str, key: str) -> Optional[list]:
+    """
+    Returns the JSON array stored under `key` in otherwise malformed text.
+    Walks from the first '[' after the key to its balanced ']', so nested
+    lists are not truncated.
+    """
+    key_pos = text.find(f'"{key}"')
+    if key_pos == -1:
+        return None
+    start = text.find('[', key_pos)
+    if start == -1:
+        return None
+    end = _balanced_end(text, start)
+    if end is None:
+        return None
+    try:
+        return orjson.loads(text[start:end + 1])
+    except json.JSONDecodeError: # orjson.JSONDecodeError subclasses it
+        return None
+
+def _salvage_array_items(text: str, key: str) -> Optional[list]:
+    """
+    Last-resort recovery for an array under `key` that never closes cleanly
+    (output truncated mid-item, a trailing or missing comma): streams it with
+    ijson and keeps every element that parsed completely before the error.
+    None if nothing parsed.
+    """
+    key_pos = text.find(f'"{key}"')
+    if key_pos != -1:
+        start = text.find('[', key_pos)
+    else:
+        # A bare (truncated) top-level list
+        start = 0 if text.startswith('[') else -1
+    if start == -1:
+        return None
+    items = []
+    try:
+        for item in ijson.items(io.BytesIO(text[start:].encode("utf-8")), "item", use_float=True):
+            items.append(item)
+    except ijson.JSONError:
+        pass
+    return items or None
+
+class _StreamScanner:
+    """
+    Incremental counterpart of _balanced_end for a streamed reply: feed() takes
+    only the newly arrived text and keeps depth, string and escape state between
+    calls, so a whole stream is scanned once no matter how it is split.
+    """
+
+    def __init__(self):
+        self._head = ""  # text seen before the opening bracket
+        self._started = False
+        self._prose = False
+        self._depth = 0
+        self._in_string = False
+        self._escape_next = False
+        self.complete = False
+
+    def feed(self, new_text: str) -> bool:
+        """
+        Returns True once the top-level JSON value has closed. Replies that do not
+        open with JSON (prose preamble) never complete and are read to the end,
+        since _parse_response can often still dig the array out of them.
+        """
+        if self.complete or self._prose:
+            return self.complete
+        if not self._started:
+            self._head += new_text
+            body = self._head.lstrip()
+            if "```json".startswith(body):
+                return False
+            body = body.removeprefix("```json").removeprefix("```").lstrip()
+            if not body:
+                return False
+            if body[0] not in '[{':
+                self._prose = True
+                return False
+            self._started = True
+            self._head = ""
+            new_text = body
+
+        # An escape at the very end of the previous piece applies to this one's first character
+        escaped_pos = 0 if self._escape_next else -1
+        for match in _JSON_STRUCTURAL_RE.finditer(new_text):
+            pos = match.start()
+            if pos == escaped_pos:
+                continue
+            ch = new_text[pos]
+            if self._in_string:
+                if ch == '\\':
+                    escaped_pos = pos + 1
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in '[{':
+                self._depth += 1
+            elif ch in ']}':
+                self._depth -= 1
+                if self._depth == 0:
+                    self.complete = True
+                    return True
+        self._escape_next = escaped_pos == len(new_text)
+        return False
+
+def _stream_state(text: str) -> str:
+    """
+    Classifies a (partially) received response in one go: "complete" once the
+    top-level JSON value has closed, else "partial".
+    """
+    return "complete" if _StreamScanner().feed(text) else "partial"
+
+def _is_retryable(exc: BaseException) -> bool:
+    """
+    Transient provider errors (rate limits, 5xx, dropped connections) are worth
+    retrying on the same model. Timeouts and everything else fall through to
+    the next model in the chain.
+    """
+    if isinstance(exc, APITimeoutError):
+        return False
+    if isinstance(exc, (RateLimitError, InternalServerError, APIConnectionError)):
+        return True
+    if HAS_GOOGLE and isinstance(exc, (
+        google_exceptions.ResourceExhausted,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.InternalServerError,
+    )):
+        return True
+    return False
+
+# Local retry with backoff before downgrading to the next model; bounded so a
+# chunk's worst case stays predictable.
+_provider_retry = retry(
+    retry=retry_if_exception(_is_retryable),
+    stop=stop_after_attempt(3) | stop_after_delay(30),
+    wait=wait_exponential_jitter(initial=1, max=8),
+    reraise=True,
+)
+
+# Consecutive chunks bundled per request; oversized chunks are sent alone
+CHUNKS_PER_CALL = max(1, int(os.getenv("AI_CHUNKS_PER_CALL", "4")))
+MAX_GROUP_PAYLOAD_BYTES = 60_000
+
+# Exact-match LLM response cache (set PODCAST_ADS_NO_CACHE=1 to bypass)
+RESPONSE_CACHE_DIR = Path.home() / ".cache" / "podcast_ads" / "responses"
+# Entries older than this are ignored and removed (0 keeps them forever)
+RESPONSE_CACHE_TTL_SEC = float(os.getenv("PODCAST_ADS_CACHE_TTL_DAYS", "30")) * 86400
+
 class AIEngine:
-    def __init__(self, api_key: str = None):
+    # Sent first and byte-identical on every call so provider prompt caching can
+    # reuse it; per-chunk context and the transcript JSON are appended after it.
+    STATIC_SYSTEM_PROMPT = """SYSTEM INSTRUCTION: You are a helpful assistant performing a technical analysis task on a fictional podcast script. The content is for educational purposes only. You output strict JSON.
+
+You are an expert Podcast Editor.
+After these instructions you will receive a note about which part of the episode this is, followed by the transcript (after "DATA:").
+DATA is {"chunks": [{"id": <chunk number>, "segs": [...]}]}; consecutive chunks continue each other.
+Transcript fields: s=start (seconds), e=end (seconds), t=text. Timestamps are absolute within the episode.
+
+**Your Goal:** Identify non-content segments (Ads, Intros) to remove.
+
+**Part 1: Semantic Cues for Removal**
+* **Pre-roll Ads:** Commercials playing immediately at 00:00 before the show starts.
+* **Intro:** Theme music lyrics, "Welcome to the show".
+* **Ads:** Phrases like "Sponsored by", "Use code", "Go to [website]", "Brought to you by". Any product pitch (VPN, Mattress, Casino, Event) unrelated to the story.
+* **Outro:** "Thanks for listening", "Rate and review".
+
+**Part 2: Guidelines**
+*   Be aggressive in identifying ads. If it sounds like a commercial, mark it.
+*   Use the precise `s` and `e` timestamps provided in the input JSON as `start` and `end`.
+
+**Output Format:**
+Return valid JSON containing ONLY the list of segments to remove, covering every chunk in DATA.
+
+{
+    "segments_to_remove": [
+        {"type": "intro", "start": 0.0, "end": 15.5},
+        {"type": "ad", "start": 450.2, "end": 480.0}
+    ]
+}
+"""
+
+    # Identical for every Gemini call
+    SAFETY_SETTINGS = {
+        "HARM_CATEGORY_HARASSMENT": "BLOCK_NONE",
+        "HARM_CATEGORY_HATE_SPEECH": "BLOCK_NONE",
+        "HARM_CATEGORY_SEXUALLY_EXPLICIT": "BLOCK_NONE",
+        "HARM_CATEGORY_DANGEROUS_CONTENT": "BLOCK_NONE",
+    }
+
+    def __init__(self, api_key: str = None, max_concurrency: Optional[int] = None):
         # API Keys
         self.google_api_key = api_key or os.getenv("GEMINI_API_KEY")
         self.or_api_key = os.getenv("OPENROUTER_API_KEY")
@@ -34,167 +270,451 @@ class AIEngine:
                 "openrouter/x-ai/grok-4.1-fast"
             ]
             
+        # Provider routing resolved once: (model name, is_openrouter)
+        self._call_chain = [self._resolve_model(m) for m in self.model_chain]
+
+        # Upper bound on chunk requests in flight; size it to the account's rate limit
+        if max_concurrency is None:
+            max_concurrency = int(os.getenv("AI_MAX_CONCURRENCY", "8"))
+        self.max_concurrency = max(1, max_concurrency)
+
         # Initialize Clients
         if HAS_GOOGLE and self.google_api_key:
-            genai.configure(api_key=self.google_api_key)
-            
-        self.or_client = None
-        if self.or_api_key:
-            self.or_client = OpenAI(
-                base_url=self.openai_base_url,
-                api_key=self.or_api_key,
-            )
+            # gRPC keeps one persistent HTTP/2 channel shared by all worker threads
+            genai.configure(api_key=self.google_api_key, transport="grpc")
+        # GenerativeModel instances by model name, built on first use
+        self._gemini_models = {}
+
+        self.use_response_cache = os.getenv("PODCAST_ADS_NO_CACHE", "") not in ("1", "true", "yes")
+
+    @staticmethod
+    def _resolve_model(model_id: str) -> tuple:
+        """Splits an AI_MODEL_ORDER entry into (model name, is_openrouter)."""
+        for prefix in ("openrouter/", "or/"):
+            if model_id.startswith(prefix):
+                return model_id[len(prefix):], True
+        return model_id, False
+
+    def _make_or_client(self) -> Optional[AsyncOpenAI]:
+        """
+        Async clients are bound to the event loop that first uses them,
+        so a fresh one is created for every analysis run. All concurrent
+        chunk requests multiplex over one HTTP/2 connection instead of
+        paying a TLS handshake each.
+        """
+        if not self.or_api_key:
+            return None
+        # Owned by the returned client; closing it closes the pool. Kept off
+        # self so concurrent runs (one per batch file) never share a pool.
+        http_client = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(REQUEST_TIMEOUT_SEC),
+            limits=httpx.Limits(
+                max_connections=max(16, self.max_concurrency),
+                max_keepalive_connections=max(16, self.max_concurrency),
+                # Outlive the retry backoff (up to 8s) so retries reuse the connection
+                keepalive_expiry=30,
+            ),
+        )
+        return AsyncOpenAI(
+            base_url=self.openai_base_url,
+            api_key=self.or_api_key,
+            timeout=REQUEST_TIMEOUT_SEC,
+            max_retries=0,  # the model chain is the retry strategy
+            http_client=http_client,
+        )
 
     def analyze_transcript(self, transcript_path: str) -> Dict[str, Any]:
-        console.log(f"[cyan]Reading transcript from {transcript_path}...[/cyan]")
-        with open(transcript_path, 'r') as f:
-            whisper_data = json.load(f)
+        """Sync wrapper around analyze_transcript_async for non-async callers."""
+        return asyncio.run(self.analyze_transcript_async(transcript_path))
 
-        # Chunking logic (10 mins) with Overlap (1 min)
-        chunk_size_sec = 600 
-        overlap_sec = 60
-        whisper_segments = whisper_data.get("segments", [])
-        
+    def _build_chunks(self, transcript_path: str, chunk_size_sec: int = 600, overlap_sec: int = 60) -> List[List[Dict]]:
+        """
+        Streams Whisper segments and buckets them into overlapping time windows
+        (10 mins with 1 min overlap by default) without loading the whole file.
+        A segment belongs to every window where start <= seg.start < start + chunk_size.
+        """
+        step = chunk_size_sec - overlap_sec
         chunks = []
-        start_time = 0
-        file_duration = whisper_segments[-1]['end'] if whisper_segments else 0
-        
-        while start_time < file_duration:
-            window_end = start_time + chunk_size_sec
-            current_chunk = []
-            for seg in whisper_segments:
-                s = seg.get("start", 0)
-                if s >= start_time and s < window_end:
-                    current_chunk.append(seg)
-            
-            if current_chunk:
-                chunks.append(current_chunk)
-            
-            start_time += (chunk_size_sec - overlap_sec)
+        active = deque()  # [window_start, segments] for windows still accepting segments
+        next_window = 0
+
+        with open(transcript_path, 'rb') as f:
+            # Whisper output is time-ordered, so windows close in order
+            for raw in ijson.items(f, "segments.item", use_float=True):
+                # Drop tokens/logprobs/seek right away; windows only hold what is sent
+                seg = {"start": raw.get("start", 0), "end": raw.get("end", 0), "text": raw.get("text", "")}
+                s = seg["start"]
+
+                while active and s >= active[0][0] + chunk_size_sec:
+                    chunks.append(active.popleft()[1])
+
+                while next_window <= s:
+                    # Skip windows that fall entirely inside a gap
+                    if s < next_window + chunk_size_sec:
+                        active.append([next_window, []])
+                    next_window += step
+
+                for window in active:
+                    window[1].append(seg)
+
+        chunks.extend(window[1] for window in active)
+        return chunks
+
+    async def analyze_transcript_async(self, transcript_path: str) -> Dict[str, Any]:
+        console.log(f"[cyan]Reading transcript from {transcript_path}...[/cyan]")
+        # Parsing a long transcript would otherwise block in-flight I/O on this loop
+        chunks = self._dedupe_overlap(await asyncio.to_thread(self._build_chunks, transcript_path))
 
         all_remove_segments = []
+        tasks = []
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        or_client = self._make_or_client()
 
-        for i, chunk_segs in enumerate(chunks):
-            context_note = f"This is Chunk {i+1} of {len(chunks)}. "
-            if i > 0:
-                context_note += "Audio starts mid-conversation. "
-            else:
-                context_note += "Audio is the START of the file. Watch out for Pre-roll Ads before the Intro. "
-
-            prompt = f"""
-            SYSTEM INSTRUCTION: You are a helpful assistant performing a technical analysis task on a fictional podcast script. The content is for educational purposes only.
-
-            You are an expert Podcast Editor. 
-            I am providing you with a raw JSON transcript segment ({context_note}).
-
-            **Your Goal:** Identify non-content segments (Ads, Intros) to remove.
-
-            **Part 1: Semantic Cues for Removal**
-            * **Pre-roll Ads:** Commercials playing immediately at 00:00 before the show starts.
-            * **Intro:** Theme music lyrics, "Welcome to the show".
-            * **Ads:** Phrases like "Sponsored by", "Use code", "Go to [website]", "Brought to you by". Any product pitch (VPN, Mattress, Casino, Event) unrelated to the story.
-            * **Outro:** "Thanks for listening", "Rate and review".
-
-            **Part 2: Guidelines**
-            *   Be aggressive in identifying ads. If it sounds like a commercial, mark it.
-            *   Use the precise `start` and `end` timestamps provided in the input JSON.
-
-            **Output Format:**
-            Return valid JSON containing ONLY the list of segments to remove.
-            {context_note}
-
-            {{
-                "segments_to_remove": [
-                    {{"type": "intro", "start": 0.0, "end": 15.5}},
-                    {{"type": "ad", "start": 450.2, "end": 480.0}}
-                ]
-            }}
-            """
-            
-            chunk_payload = json.dumps(chunk_segs)
-            
-            # Unified execution loop
-            response_data = self._process_chunk_with_fallbacks(prompt, chunk_payload, i+1)
-            
-            if response_data:
-                all_remove_segments.extend(response_data.get("segments_to_remove", []))
+        async def _run_group(group, chunk_label, chunk_prompt):
+            async with semaphore:
+                result = await self._process_chunk_with_fallbacks(chunk_prompt, chunk_label, or_client, len(group))
+            if result or len(group) == 1:
+                return result
+            # A bundle can fail where its parts would not (e.g. output truncated)
+            console.print(f"[yellow]Retrying Chunks {chunk_label} one at a time...[/yellow]")
+            parts = await asyncio.gather(
+                *(_run_group([item], *self._group_prompt([item], len(chunks))) for item in group),
+                return_exceptions=True,
+            )
+            return {"segments_to_remove": [
+                seg for part in parts if isinstance(part, dict) for seg in part.get("segments_to_remove", [])
+            ]}
+
+        labels = []
+        for group in self._group_chunks([self._compact_segments(c) for c in chunks]):
+            chunk_label, chunk_prompt = self._group_prompt(group, len(chunks))
+            # Requests are independent, so fire them all and let the semaphore pace them
+            labels.append(chunk_label)
+            tasks.append(_run_group(group, chunk_label, chunk_prompt))
+
+        try:
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            if or_client:
+                await or_client.close()
+
+        # gather preserves task order, so results line up with their labels
+        seen = set()
+        for chunk_label, response_data in zip(labels, results):
+            if isinstance(response_data, Exception):
+                console.print(f"[bold red]Chunk {chunk_label} crashed: {response_data}[/bold red]")
+                continue
+            if not response_data:
+                continue
+            for seg in response_data.get("segments_to_remove", []):
+                # Adjacent chunks can flag the same boundary ad twice
+                key = self._result_key(seg)
+                if key in seen:
+                    continue
+                seen.add(key)
+                all_remove_segments.append(seg)
 
         return {"segments_to_remove": all_remove_segments}
 
-    def _process_chunk_with_fallbacks(self, prompt, chunk_data, chunk_num) -> Dict:
+    @staticmethod
+    def _group_prompt(group: List[tuple], total_chunks: int) -> tuple:
+        """Returns (chunk_label, chunk_prompt) for a group from _group_chunks."""
+        first_num, last_num = group[0][0], group[-1][0]
+        chunk_label = str(first_num) if first_num == last_num else f"{first_num}-{last_num}"
+        noun = "Chunk" if first_num == last_num else "Chunks"
+        context_note = f"This request covers {noun} {chunk_label} of {total_chunks}. "
+        if first_num > 1:
+            context_note += (
+                "Audio starts mid-conversation. The previous minute was already analyzed in the prior chunk, "
+                f"so this chunk may open in the middle of an ad; only classify segments from {group[0][1][0]['s']}s on. "
+            )
+        else:
+            context_note += "Audio is the START of the file. Watch out for Pre-roll Ads before the Intro. "
+
+        # Assembled from the per-chunk JSON already encoded by _group_chunks;
+        # byte-identical to dumping the {"chunks": [...]} object directly
+        chunk_payload = (
+            b'{"chunks":[' + b",".join(b'{"id":%d,"segs":%s}' % (num, encoded) for num, _, encoded in group) + b"]}"
+        ).decode()
+        # Everything chunk-specific goes after the static prefix
+        return chunk_label, f"{context_note}\n\nDATA:\n{chunk_payload}"
+
+    @staticmethod
+    def _compact_segments(chunk_segs: List[Dict]) -> List[Dict]:
+        """
+        Keeps only what the model needs (start, end, text). Whisper's
+        tokens/logprob/seek fields would otherwise dominate the input tokens.
+        """
+        return [
+            {"s": round(seg.get("start", 0), 2), "e": round(seg.get("end", 0), 2), "t": seg.get("text", "").strip()}
+            for seg in chunk_segs
+        ]
+
+    @staticmethod
+    def _group_chunks(compact_chunks: List[List[Dict]]) -> List[List[tuple]]:
+        """
+        Bundles up to CHUNKS_PER_CALL consecutive chunks into one request so the
+        static prompt is paid once per group. A group stops growing before it
+        exceeds MAX_GROUP_PAYLOAD_BYTES, keeping answers within max_output_tokens.
+        Returns groups of (chunk_num, compact_segments, encoded_segments); each
+        chunk is JSON-encoded once here and reused for the request payload.
+        """
+        groups = []
+        current, current_bytes = [], 0
+        for chunk_num, segs in enumerate(compact_chunks, 1):
+            encoded = orjson.dumps(segs)
+            size = len(encoded)
+            if current and (len(current) >= CHUNKS_PER_CALL or current_bytes + size > MAX_GROUP_PAYLOAD_BYTES):
+                groups.append(current)
+                current, current_bytes = [], 0
+            current.append((chunk_num, segs, encoded))
+            current_bytes += size
+        if current:
+            groups.append(current)
+        return groups
+
+    @staticmethod
+    def _result_key(seg: Dict) -> tuple:
+        """
+        Dedup key for a returned segment. Rounded to 0.1s so "12.5" and 12.50
+        from different requests collapse; unparsable values key on themselves.
+        """
+        try:
+            return (round(float(seg.get("start")), 1), round(float(seg.get("end")), 1))
+        except (TypeError, ValueError):
+            return (seg.get("start"), seg.get("end"))
+
+    @staticmethod
+    def _segment_id(seg: Dict) -> tuple:
+        return (round(seg.get("start", 0), 3), round(seg.get("end", 0), 3))
+
+    def _dedupe_overlap(self, chunks: List[List[Dict]]) -> List[List[Dict]]:
+        """
+        Drops segments already sent with a previous chunk so the overlap
+        minute is not billed twice. Chunks left empty are dropped.
+        """
+        # Overlap is shorter than the window step, so a segment can only be
+        # repeated by the very next window. Segments are time-ordered, so the
+        # repeats are the tail of the previous window and the head of this one.
+        previous = []
+        deduped = []
+        for chunk_segs in chunks:
+            skip = 0
+            if previous and chunk_segs:
+                first_start = chunk_segs[0].get("start", 0)
+                tail = set()
+                for seg in reversed(previous):
+                    if seg.get("start", 0) < first_start:
+                        break
+                    tail.add(self._segment_id(seg))
+                while skip < len(chunk_segs) and self._segment_id(chunk_segs[skip]) in tail:
+                    skip += 1
+            previous = chunk_segs
+            if skip < len(chunk_segs):
+                deduped.append(chunk_segs[skip:])
+        return deduped
+
+    def _response_cache_path(self, chunk_prompt: str) -> Path:
+        key = hashlib.sha256(
+            "\n".join(self.model_chain).encode("utf-8")
+            + self.STATIC_SYSTEM_PROMPT.encode("utf-8")
+            + chunk_prompt.encode("utf-8")
+        ).hexdigest()
+        return RESPONSE_CACHE_DIR / f"{key}.json"
+
+    def _load_cached_response(self, cache_path: Path) -> Optional[Dict]:
+        try:
+            if RESPONSE_CACHE_TTL_SEC > 0 and time.time() - cache_path.stat().st_mtime > RESPONSE_CACHE_TTL_SEC:
+                cache_path.unlink(missing_ok=True)
+                return None
+            with open(cache_path, 'rb') as f:
+                return orjson.loads(f.read())
+        except (OSError, orjson.JSONDecodeError):
+            return None
+
+    def _store_cached_response(self, cache_path: Path, data: Dict):
+        # Only well-formed results are cached so partial failures are retried next run
+        if not isinstance(data, dict) or not isinstance(data.get("segments_to_remove"), list):
+            return
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix(".tmp")
+            with open(tmp_path, 'wb') as f:
+                f.write(orjson.dumps(data))
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            console.log(f"[dim]Could not write response cache: {e}[/dim]")
+
+    async def _process_chunk_with_fallbacks(self, chunk_prompt, chunk_label, or_client=None, n_chunks: int = 1) -> Dict:
         """Iterates through the model chain until one succeeds."""
+        cache_path = None
+        if self.use_response_cache:
+            cache_path = self._response_cache_path(chunk_prompt)
+            cached = self._load_cached_response(cache_path)
+            if cached is not None:
+                console.log(f"[dim]Chunk {chunk_label}: using cached response.[/dim]")
+                return cached
         
-        for model_id in self.model_chain:
-            is_openrouter = model_id.startswith("openrouter/") or model_id.startswith("or/")
-            clean_model_name = model_id.replace("openrouter/", "").replace("or/", "")
-            
+        # A bundled request generates output for every chunk in it
+        timeout = REQUEST_TIMEOUT_SEC * n_chunks
+        for clean_model_name, is_openrouter in self._call_chain:
+            started = time.monotonic()
             try:
                 if is_openrouter:
-                    return self._call_openrouter(clean_model_name, prompt, chunk_data, chunk_num)
+                    result = await self._call_openrouter(or_client, clean_model_name, chunk_prompt, chunk_label, timeout)
                 else:
-                    return self._call_gemini(clean_model_name, prompt, chunk_data, chunk_num)
+                    result = await self._call_gemini(clean_model_name, chunk_prompt, chunk_label, timeout)
+                console.log(f"[green]Chunk {chunk_label} done ({clean_model_name}, {time.monotonic() - started:.1f}s).[/green]")
+                if cache_path:
+                    self._store_cached_response(cache_path, result)
+                return result
+            except (asyncio.TimeoutError, TimeoutError):
+                console.print(f"[yellow]Model {clean_model_name} timed out after {timeout:.0f}s. Trying next...[/yellow]")
+                continue
             except Exception as e:
                 # If specific provider failed, log and continue to next model
                 console.print(f"[yellow]Model {clean_model_name} failed: {e}. Trying next...[/yellow]")
                 continue
         
-        console.print(f"[bold red]All models in chain failed for Chunk {chunk_num}.[/bold red]")
+        console.print(f"[bold red]All models in chain failed for Chunk {chunk_label}.[/bold red]")
         return {}
 
-    def _call_gemini(self, model_name, prompt, chunk_data, chunk_num) -> Dict:
+    @_provider_retry
+    async def _call_gemini(self, model_name, chunk_prompt, chunk_label, timeout: float = REQUEST_TIMEOUT_SEC) -> Dict:
         if not HAS_GOOGLE or not self.google_api_key:
             raise RuntimeError("Google API not configured")
 
-        safety_settings = {
-            "HARM_CATEGORY_HARASSMENT": "BLOCK_NONE",
-            "HARM_CATEGORY_HATE_SPEECH": "BLOCK_NONE",
-            "HARM_CATEGORY_SEXUALLY_EXPLICIT": "BLOCK_NONE",
-            "HARM_CATEGORY_DANGEROUS_CONTENT": "BLOCK_NONE",
-        }
-        
-        with console.status(f"[bold cyan]Analyzing Chunk {chunk_num} (Google: {model_name})...[/bold cyan]"):
-            model = genai.GenerativeModel(model_name)
-            response = model.generate_content(
-                [prompt, chunk_data],
-                generation_config={"response_mime_type": "application/json", "max_output_tokens": 8192},
-                safety_settings=safety_settings,
-                stream=False
+        # Only one rich live display may be active at a time, so concurrent
+        # chunks log a line instead of holding a spinner.
+        console.log(f"[cyan]Analyzing Chunk {chunk_label} (Google: {model_name})...[/cyan]")
+        model = self._gemini_models.get(model_name)
+        if model is None:
+            # The static prompt rides along as the system instruction, the same
+            # role it has for OpenRouter, so each request carries only the chunk
+            model = self._gemini_models.setdefault(
+                model_name, genai.GenerativeModel(model_name, system_instruction=self.STATIC_SYSTEM_PROMPT)
             )
-            text = response.text.strip()
-            return self._parse_response(text)
+        # The sync SDK client is thread-safe, whereas its asyncio client is tied
+        # to a single event loop (one per analyze_transcript call).
+        text, finish_reason = await asyncio.wait_for(
+            asyncio.to_thread(self._stream_gemini, model, chunk_prompt, timeout),
+            timeout=timeout,
+        )
+        return self._check_and_parse(text, finish_reason, "STOP")
+
+    def _stream_gemini(self, model, chunk_prompt, timeout: float = REQUEST_TIMEOUT_SEC) -> tuple:
+        """
+        Streams a Gemini response and stops reading as soon as the JSON value
+        is complete. Returns (text, finish_reason name).
+        """
+        response = model.generate_content(
+            chunk_prompt,
+            generation_config={"response_mime_type": "application/json", "max_output_tokens": 8192},
+            safety_settings=self.SAFETY_SETTINGS,
+            stream=True,
+            # Server-side deadline so the worker thread is released too
+            request_options={"timeout": timeout},
+        )
+        text = ""
+        scanner = _StreamScanner()
+        finish_reason = None
+        for piece in response:
+            if piece.candidates:
+                finish_reason = getattr(piece.candidates[0].finish_reason, "name", None)
+            try:
+                new_text = piece.text
+            except ValueError:
+                # Pieces without parts (blocked prompt, final metadata chunk)
+                continue
+            text += new_text
+            if scanner.feed(new_text):
+                return text, "STOP"
+        if finish_reason is None and not text:
+            raise RuntimeError(f"no candidates returned (prompt_feedback={response.prompt_feedback})")
+        return text, finish_reason
 
-    def _call_openrouter(self, model_name, prompt, chunk_data, chunk_num) -> Dict:
-        if not self.or_client:
+    @_provider_retry
+    async def _call_openrouter(self, or_client, model_name, chunk_prompt, chunk_label, timeout: float = REQUEST_TIMEOUT_SEC) -> Dict:
+        if not or_client:
             raise RuntimeError("OpenRouter API not configured")
             
-        with console.status(f"[bold cyan]Analyzing Chunk {chunk_num} (OpenRouter: {model_name})...[/bold cyan]"):
-            completion = self.or_client.chat.completions.create(
-                model=model_name,
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that outputs strict JSON."},
-                    {"role": "user", "content": prompt + "\n\nDATA:\n" + chunk_data}
-                ],
-            )
-            text = completion.choices[0].message.content
-            return self._parse_response(text)
+        console.log(f"[cyan]Analyzing Chunk {chunk_label} (OpenRouter: {model_name})...[/cyan]")
+        text, finish_reason = await asyncio.wait_for(
+            self._stream_openrouter(or_client, model_name, chunk_prompt),
+            timeout=timeout,
+        )
+        return self._check_and_parse(text, finish_reason, "stop")
+
+    async def _stream_openrouter(self, or_client, model_name, chunk_prompt) -> tuple:
+        """Async counterpart of _stream_gemini for OpenAI-compatible providers."""
+        stream = await or_client.chat.completions.create(
+            model=model_name,
+            messages=[
+                {"role": "system", "content": self.STATIC_SYSTEM_PROMPT},
+                {"role": "user", "content": chunk_prompt}
+            ],
+            stream=True,
+        )
+        text = ""
+        scanner = _StreamScanner()
+        finish_reason = None
+        try:
+            async for event in stream:
+                if not event.choices:
+                    continue
+                choice = event.choices[0]
+                finish_reason = choice.finish_reason or finish_reason
+                if not choice.delta.content:
+                    continue
+                text += choice.delta.content
+                if scanner.feed(choice.delta.content):
+                    return text, "stop"
+        finally:
+            await stream.close()
+        return text, finish_reason
+
+    def _check_and_parse(self, text: str, finish_reason: Optional[str], ok_reason: str) -> Dict:
+        """
+        Guards against 200 responses that carry nothing usable (blocked,
+        truncated, empty or prose) so they fall through to the next model
+        instead of counting as "no ads found". Parsing is attempted first, so
+        a prose-wrapped or truncated reply still counts if segments survive.
+        """
+        text = (text or "").strip()
+        try:
+            data = self._parse_response(text)
+        except ValueError as e:
+            if finish_reason != ok_reason:
+                raise RuntimeError(f"generation did not finish cleanly (finish_reason={finish_reason})") from e
+            raise RuntimeError(f"response is not JSON: {text[:80]!r}") from e
+        if not isinstance(data, dict) or not isinstance(data.get("segments_to_remove"), list):
+            raise RuntimeError(f"response has no segments_to_remove list: {text[:80]!r}")
+        return data
 
     def _parse_response(self, text) -> Dict:
-        if text.startswith("```json"):
-            text = text[7:]
-        if text.endswith("```"):
-            text = text[:-3]
+        # Strip markdown code fences some models wrap around the JSON
+        text = (text or "").strip().removeprefix("```json").removesuffix("```").strip()
         
         try:
-            data = json.loads(text)
+            # orjson for the common well-formed case; json stays for the lenient recovery below
+            data = orjson.loads(text)
             if isinstance(data, list):
                 return {"segments_to_remove": data}
             return data
         except json.JSONDecodeError:
-            segments = []
-            seg_match = re.search(r'"segments_to_remove"\s*:\s*(\[.*?\])', text, re.DOTALL)
-            if seg_match:
+            # Common LLM shape: the object body without its braces
+            if text.startswith('"segments_to_remove"'):
                 try:
-                    segments = json.loads(seg_match.group(1))
-                except:
+                    data = json.loads("{" + text + "}")
+                    if isinstance(data, dict):
+                        return data
+                except json.JSONDecodeError:
                     pass
+            segments = _extract_json_array(text, "segments_to_remove")
+            if segments is None:
+                segments = _salvage_array_items(text, "segments_to_remove")
+            if segments is None:
+                # Garbage or truncated output; raise so the next model is tried
+                raise ValueError(f"could not parse segments from response: {text[:80]!r}")
             return {"segments_to_remove": segments}
@@ -1,23 +1,30 @@
 import os
+import asyncio
 import typer
-from typing import Optional, Union, List, Dict, Any
+from typing import Optional, List, Dict, Any, TYPE_CHECKING
 from pathlib import Path
 from dotenv import load_dotenv
 from rich.console import Console
-import shutil # For copying files
-import yt_dlp # For MediaDownloader's internal info extraction
-import ffmpeg # For direct ffmpeg calls in main
 import hashlib # For stable hashing of generic URLs
-
-from .ai_engine import AIEngine
-from .processor import AudioProcessor
-from .media_downloader import MediaDownloader
-from .player import Player
-from .utils import parse_timestamp 
-
-import json
+import socket # For submitting jobs to --serve
+import stat
 import re # For cleaning filenames
 from urllib.parse import urlparse # For generic URL parsing
+import ijson
+import orjson
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from functools import lru_cache, partial
+
+from .utils import parse_timestamp, audio_fingerprint
+from .player import skip_script
+
+# The engines pull in the LLM SDKs, faster-whisper and yt-dlp (seconds of import
+# time), so they are imported where first used; --help stays instant.
+if TYPE_CHECKING:
+    from .ai_engine import AIEngine
+    from .processor import AudioProcessor
 
 # Load environment variables
 load_dotenv()
@@ -27,15 +34,25 @@ console = Console()
 
 IS_ANDROID = "com.termux" in os.environ.get("PREFIX", "")
 
+# Where --serve listens by default
+DEFAULT_SOCKET_PATH = os.path.join(os.environ.get("TMPDIR", "/tmp"), "podcast_ads.sock")
+
+URL_PREFIXES = ("http://", "https://")
+
 # --- File Stem Utilities ---
+_UNSAFE_STEM_CHARS_RE = re.compile(r'[^\w\-_\.]')
+
+# Candidate-stem building sanitizes/hashes the same few strings repeatedly per item
+@lru_cache(maxsize=256)
 def _sanitize_file_stem(value: str, max_len: int = 80) -> str:
     """Sanitize and trim a filename stem."""
-    sanitized = re.sub(r'[^\w\-_\.]', '', value)
+    sanitized = _UNSAFE_STEM_CHARS_RE.sub('', value)
     sanitized = sanitized.strip("._-")
     if len(sanitized) > max_len:
         sanitized = sanitized[:max_len]
     return sanitized or "media_item"
 
+@lru_cache(maxsize=256)
 def _short_hash(value: str, length: int = 10) -> str:
     return hashlib.md5(value.encode("utf-8")).hexdigest()[:length]
 
@@ -66,7 +83,21 @@ def _extract_youtube_id(parsed_url) -> Optional[str]:
             return candidate
     return None
 
-def _build_candidate_stems(current_input_target: str, is_url: bool, is_youtube: bool) -> List[str]:
+def _is_url(target: str) -> bool:
+    return target.startswith(URL_PREFIXES)
+
+def _classify_target(target: str) -> tuple:
+    """
+    Classifies an input once: (is_url, is_youtube, parsed_url_or_None).
+    YouTube is decided on the host, not by substring anywhere in the target.
+    """
+    if not _is_url(target):
+        return False, False, None
+    parsed = urlparse(target)
+    netloc = (parsed.netloc or "").lower()
+    return True, ("youtube.com" in netloc or "youtu.be" in netloc), parsed
+
+def _build_candidate_stems(current_input_target: str, is_url: bool, is_youtube: bool, parsed=None) -> List[str]:
     """
     Returns ordered candidate stems to look for cached artifacts.
     1) Stable slug based on normalized input (primary)
@@ -76,7 +107,7 @@ def _build_candidate_stems(current_input_target: str, is_url: bool, is_youtube:
     normalized_target = current_input_target.strip()
 
     if is_url:
-        parsed = urlparse(normalized_target)
+        parsed = parsed or urlparse(normalized_target)
         netloc = (parsed.netloc or "").lower()
         path_stem = Path(parsed.path).stem
         short = _short_hash(normalized_target, length=8)
@@ -111,91 +142,117 @@ def _build_candidate_stems(current_input_target: str, is_url: bool, is_youtube:
             seen.add(stem)
     return deduped
 
+# Stable stems end in an 8-hex-char hash; older runs named caches after the bare title
+_HASHED_STEM_RE = re.compile(r'_[0-9a-f]{8}$')
+
+def _has_legacy_analysis(out_path: Path) -> bool:
+    """Whether any analysis cache in out_path uses a pre-hash (title-based) stem."""
+    suffix = "_analysis.json"
+    with os.scandir(out_path) as entries:
+        return any(
+            entry.name.endswith(suffix) and not _HASHED_STEM_RE.search(entry.name[:-len(suffix)])
+            for entry in entries
+        )
+
 # --- Helper Functions for Output Generation ---
-def _generate_lua_script(file_stem: str, out_path: Path, segments_to_remove: List[Dict]) -> str:
-    """Generates and saves an MPV Lua script for skipping segments."""
-    lua_skips = "local skips = {\n"
-    for seg in segments_to_remove:
-        start = seg.get('start')
-        end = seg.get('end')
-        if start is None or end is None: continue
-        
-        start = float(start)
-        end = float(end)
-        lua_skips += f"    {{ start = {start}, stop = {end} }},\n"
-    lua_skips += "}\n"
-    
-    lua_script_content = lua_skips + """
-mp.add_periodic_timer(0.25, function()
-    local pos = mp.get_property_number("time-pos")
-    if not pos then return end
-    
-    for i, skip in ipairs(skips) do
-        if pos >= skip.start and pos < skip.stop then
-            mp.set_property_number("time-pos", skip.stop)
-            mp.osd_message("Auto-Skipped Ad Section")
-            break -- Only skip one segment at a time
-        end
-    end
-end)
-"""
+def _ad_spans(segments_to_remove: List[Dict]) -> List[tuple]:
+    """
+    Normalizes removed segments once into (start_sec, end_sec) float pairs sorted by start,
+    skipping entries without both bounds. Overlapping or nested spans are merged, so both
+    starts and ends increase; every emitter below (Lua binary search, bisect) relies on that.
+    """
+    spans = sorted(
+        (parse_timestamp(seg['start']), parse_timestamp(seg['end']))
+        for seg in segments_to_remove
+        if seg.get('start') is not None and seg.get('end') is not None
+    )
+    merged = []
+    for start, end in spans:
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def _generate_lua_script(file_stem: str, out_path: Path, ad_spans: List[tuple]) -> str:
+    """Generates and saves an MPV Lua script for skipping segments (ad_spans from _ad_spans)."""
+    lua_script_content = skip_script(ad_spans)
     script_path = out_path / f"{file_stem}_skips.lua"
-    with open(script_path, "w") as f:
-        f.write(lua_script_content)
+    script_path.write_bytes(lua_script_content.encode("utf-8"))
     console.log(f"[green]Generated MPV skip script: {script_path.name}[/green]")
     return str(script_path)
 
-def _generate_srt_file(file_stem: str, out_path: Path, transcript_json_path: str, segments_to_remove: List[Dict]) -> str:
-    """Generates and saves an SRT subtitle file from Whisper JSON, filtering out ads."""
-    if not transcript_json_path or not os.path.exists(transcript_json_path):
-        console.print("[yellow]No Whisper transcript found. Cannot generate SRT.[/yellow]")
-        return None
-
-    with open(transcript_json_path, 'r') as f:
-        whisper_data = json.load(f)
-    
-    srt_content = ""
-    seq = 1
-    for w_seg in whisper_data.get("segments", []):
-        start_sec = w_seg.get("start", 0)
-        end_sec = w_seg.get("end", 0)
-        text = w_seg.get("text", "").strip()
-        
-        if not text: continue
-
-        # Filter Ads (Overlap Check)
-        midpoint = (start_sec + end_sec) / 2
-        is_ad = False
-        for r_seg in segments_to_remove:
-            r_start = r_seg.get('start')
-            r_end = r_seg.get('end')
-            if r_start is None or r_end is None: continue
-            
-            if midpoint >= float(r_start) and midpoint <= float(r_end):
-                is_ad = True
-                break
-        
-        if is_ad: continue
-
-        # Format time
-        start_srt = f"{int(start_sec // 3600):02d}:{int((start_sec % 3600) // 60):02d}:{int(start_sec % 60):02d},{int((start_sec % 1) * 1000):03d}"
-        end_srt = f"{int(end_sec // 3600):02d}:{int((end_sec % 3600) // 60):02d}:{int(end_sec % 60):02d},{int((end_sec % 1) * 1000):03d}"
-
-        srt_content += f"{seq}\n{start_srt} --> {end_srt}\n{text}\n\n"
-        seq += 1
-            
+def _ad_span_checker(ad_spans: List[tuple]):
+    """
+    Returns is_ad(t): whether t falls inside any of the merged ad_spans.
+    Each lookup is a bisect instead of a scan.
+    """
+    starts = [start for start, _ in ad_spans]
+
+    def is_ad(t: float) -> bool:
+        i = bisect_right(starts, t) - 1
+        return i >= 0 and t <= ad_spans[i][1]
+    return is_ad
+
+def _iter_whisper_segments(transcript_json_path: str):
+    """Yields Whisper segments one at a time instead of loading the whole JSON."""
+    with open(transcript_json_path, 'rb') as f:
+        yield from ijson.items(f, "segments.item", use_float=True)
+
+def _srt_timestamp(seconds: float) -> str:
+    """Formats seconds as HH:MM:SS,mmm using integer milliseconds."""
+    ms = round(seconds * 1000)
+    h, ms = divmod(ms, 3_600_000)
+    m, ms = divmod(ms, 60_000)
+    s, ms = divmod(ms, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
+
+def _write_text_artifacts(file_stem: str, out_path: Path, transcript_json_path: str, ad_spans: List[tuple],
+                          save_transcript: bool, save_subs: bool) -> None:
+    """
+    Writes the cleaned Markdown transcript and/or SRT from Whisper JSON, filtering out ads.
+    Both outputs are fed from one streamed pass over the JSON, so it is parsed once
+    and neither side is held in memory.
+    """
+    is_ad = _ad_span_checker(ad_spans)
+    clean_transcript_path = out_path / f"{file_stem}_transcript.md"
     srt_path = out_path / f"{file_stem}_clean.srt"
-    with open(srt_path, "w") as f:
-        f.write(srt_content)
-    console.log(f"[green]Generated clean SRT: {srt_path.name}[/green]")
-    return str(srt_path)
+
+    # Binary mode skips the text layer's encode/newline translation per write
+    with ExitStack() as stack:
+        md_file = stack.enter_context(open(clean_transcript_path, "wb")) if save_transcript else None
+        srt_file = stack.enter_context(open(srt_path, "wb")) if save_subs else None
+        if md_file:
+            md_file.write(f"# Transcript: {file_stem}\n\n".encode("utf-8"))
+
+        seq = 1
+        for w_seg in _iter_whisper_segments(transcript_json_path):
+            text = w_seg.get("text", "").strip()
+            if not text: continue
+
+            start_sec = w_seg.get("start", 0)
+            end_sec = w_seg.get("end", 0)
+            # Filter Ads (Overlap Check)
+            if is_ad((start_sec + end_sec) / 2): continue
+
+            if md_file:
+                md_file.write(f"{text}\n".encode("utf-8"))
+            if srt_file:
+                srt_file.write(f"{seq}\n{_srt_timestamp(start_sec)} --> {_srt_timestamp(end_sec)}\n{text}\n\n".encode("utf-8"))
+                seq += 1
+
+    if save_transcript:
+        console.print(f"[green]Clean transcript saved to {clean_transcript_path.name}[/green]")
+    if save_subs:
+        console.log(f"[green]Generated clean SRT: {srt_path.name}[/green]")
 
 # --- Main CLI Command ---
 @app.command()
 def process(
-    input_path_str: str = typer.Argument(..., help="Path to input file, directory, or media URL", metavar="INPUT"),
+    input_path_str: Optional[str] = typer.Argument(None, help="Path to input file, directory, or media URL (not needed with --serve)", metavar="INPUT", show_default=False),
     output_dir: Optional[str] = typer.Option(None, help="Directory to save processed files"),
     model_size: str = typer.Option("tiny", help="Whisper model size (tiny, small, medium)"),
+    batch_size: Optional[int] = typer.Option(None, "--batch-size", min=1, help="Whisper windows decoded per batch on PC (default: 16 on GPU, half the CPU threads on CPU; lower it if memory is tight)", show_default=False),
     api_key: Optional[str] = typer.Option(None, help="Gemini API Key (overrides .env)"),
     
     # --- Action Flags ---
@@ -206,26 +263,132 @@ def process(
     save_transcript: bool = typer.Option(False, "--save-transcript", help="Save the cleaned Markdown transcript"),
     save_subs: bool = typer.Option(False, "--save-subs", help="Save the cleaned SRT subtitle file"),
     dry_run: bool = typer.Option(False, help="Analyze only, do not perform cuts or saves (except analysis.json and skips.lua)"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Ignore any cached _analysis.json and re-run the analysis"),
+    concurrency: int = typer.Option(4, "--concurrency", min=1, help="Files processed at once in batch mode (playback always runs one at a time)"),
+    serve: bool = typer.Option(False, "--serve", help="Stay running with warm engines and accept jobs on --socket"),
+    socket_path: Optional[str] = typer.Option(None, "--socket", help=f"Unix socket: with --serve, where to listen (default {DEFAULT_SOCKET_PATH}); otherwise forward this job to that server"),
 ):
     """
     Process media to detect ads/intros/outros.
     By default, generates _analysis.json and _skips.lua. Use flags for other actions.
     """
     
+    if not serve and not input_path_str:
+        console.print("[red]Error: Missing argument 'INPUT'.[/red]")
+        raise typer.Exit(code=2)
+
+    # Hand the job to a warm --serve process instead of loading engines here
+    if socket_path and not serve:
+        if play or play_audio:
+            console.print("[red]Error: playback cannot be forwarded to a server; run without --socket.[/red]")
+            raise typer.Exit(code=1)
+        job = {
+            "input": input_path_str if _is_url(input_path_str) else str(Path(input_path_str).resolve()),
+            # Resolved here so relative paths mean the client's working directory
+            "output_dir": str(Path(output_dir or _default_output_dir()).resolve()),
+            "save_clean": save_clean,
+            "save_clean_audio": save_clean_audio,
+            "save_transcript": save_transcript,
+            "save_subs": save_subs,
+            "dry_run": dry_run,
+            "no_cache": no_cache,
+        }
+        reply = _submit_job(socket_path, job)
+        if "error" in reply:
+            console.print(f"[red]Error from server: {reply['error']}[/red]")
+            raise typer.Exit(code=1)
+        console.print(f"Processed: {reply.get('processed', 0)} | Failed: {reply.get('failed', 0)}")
+        return
+
     # 1. Setup
     key = api_key or os.getenv("GEMINI_API_KEY")
     if not key:
         console.print("[red]Error: GEMINI_API_KEY not found in .env or arguments.[/red]")
         raise typer.Exit(code=1)
+
+    if serve:
+        _run_server(socket_path or DEFAULT_SOCKET_PATH, key, model_size, batch_size, concurrency)
+        return
         
-    # Determine Output Directory
-    if output_dir is None:
-        if IS_ANDROID:
-            output_dir = "/storage/emulated/0/Download/PodcastAds"
-        else:
-            output_dir = "./output"
-            
-    out_path = Path(output_dir)
+    out_path = _resolve_output_dir(output_dir)
+    
+    # 2. Discover Files
+    try:
+        files_to_process, is_url_input = _discover_inputs(input_path_str)
+    except FileNotFoundError as e:
+        console.print(f"[red]Error: {e}[/red]")
+        raise typer.Exit(code=1)
+
+    # 3. Initialize Engines
+    from .ai_engine import AIEngine
+    from .processor import AudioProcessor
+    ai = AIEngine(key)
+    processor = AudioProcessor()
+
+    # 4. Process Loop
+    item_options = dict(
+        out_path=out_path,
+        ai=ai,
+        processor=processor,
+        model_size=model_size,
+        batch_size=batch_size,
+        # --- Action Flags ---
+        play=play,
+        play_audio=play_audio,
+        save_clean=save_clean,
+        save_clean_audio=save_clean_audio,
+        save_transcript=save_transcript,
+        save_subs=save_subs,
+        dry_run=dry_run,
+        no_cache=no_cache
+    )
+    # Playback is interactive, so items must not overlap
+    if play or play_audio:
+        concurrency = 1
+    success_count, fail_count = asyncio.run(
+        _run_batch(files_to_process, is_url_input, concurrency, item_options)
+    )
+
+    console.rule("[bold green]Batch Complete[/bold green]")
+    console.print(f"Processed: {success_count} | Failed: {fail_count}")
+
+def _run_server(socket_path: str, key: str, model_size: str, batch_size: Optional[int], concurrency: int):
+    """Builds the engines once and serves jobs until interrupted."""
+    # A socket file left by a killed server would make bind() fail; anything
+    # else at that path is not ours to delete
+    if os.path.lexists(socket_path):
+        if not _is_socket(socket_path):
+            console.print(f"[red]Error: {socket_path} exists and is not a socket; refusing to replace it.[/red]")
+            raise typer.Exit(code=1)
+        os.unlink(socket_path)
+
+    from .ai_engine import AIEngine
+    from .processor import AudioProcessor
+    engine_options = dict(ai=AIEngine(key), processor=AudioProcessor(), model_size=model_size, batch_size=batch_size)
+    try:
+        asyncio.run(_serve(socket_path, engine_options, concurrency))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if _is_socket(socket_path):
+            os.unlink(socket_path)
+
+def _is_socket(path: str) -> bool:
+    """Whether path is a Unix socket (symlinks are not followed)."""
+    try:
+        return stat.S_ISSOCK(os.lstat(path).st_mode)
+    except FileNotFoundError:
+        return False
+
+# --- Shared Setup Helpers ---
+AUDIO_EXTENSIONS = frozenset({'.mp3', '.wav', '.m4a', '.flac', '.opus', '.ogg'})
+
+def _default_output_dir() -> str:
+    return "/storage/emulated/0/Download/PodcastAds" if IS_ANDROID else "./output"
+
+def _resolve_output_dir(output_dir: Optional[str]) -> Path:
+    """Creates and returns the output directory (platform default when None)."""
+    out_path = Path(output_dir or _default_output_dir())
     
     try:
         out_path.mkdir(parents=True, exist_ok=True)
@@ -240,80 +403,201 @@ def process(
             raise
 
     console.print(f"[dim]Output directory: {out_path}[/dim]")
-    
-    # 2. Discover Files
-    files_to_process = []
-    is_url_input = input_path_str.startswith("http")
+    return out_path
+
+def _walk_media(root: str):
+    """
+    Yields audio file paths under root. Entries are judged by name straight off
+    scandir (cached d_type, no Path objects or stat() per file); symlinked
+    directories are not followed.
+    """
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                    continue
+                _, dot, ext = entry.name.rpartition('.')
+                if dot and f".{ext.lower()}" in AUDIO_EXTENSIONS:
+                    yield entry.path
+
+def _discover_inputs(input_path_str: str) -> tuple:
+    """
+    Expands INPUT into the list of items to process.
+    Returns (files_to_process, is_url_input); raises FileNotFoundError.
+    """
+    is_url_input = _is_url(input_path_str)
     
     if is_url_input:
-        files_to_process = [input_path_str]
+        _, is_youtube, parsed = _classify_target(input_path_str)
+        if is_youtube and parsed.path.rstrip("/") == "/playlist":
+            # Playlist entries go through the batch runner like a directory's files
+            from .media_downloader import MediaDownloader
+            entries = MediaDownloader.list_playlist_entries(input_path_str)
+            console.print(f"[green]Found {len(entries)} videos in playlist.[/green]")
+            return entries, True
         console.print(f"[green]Processing URL: {input_path_str}[/green]")
-    else:
-        input_path = Path(input_path_str)
-        if not input_path.exists():
-            console.print(f"[red]Error: Input {input_path} not found.[/red]")
-            raise typer.Exit(code=1)
-            
-        if input_path.is_dir():
-            extensions = ['*.mp3', '*.wav', '*.m4a', '*.flac', '*.opus', '*.ogg']
-            for ext in extensions:
-                files_to_process.extend([str(p) for p in sorted(input_path.rglob(ext))])
-            # Remove duplicates
-            files_to_process = sorted(list(set(files_to_process)))
-            console.print(f"[green]Found {len(files_to_process)} audio files in directory.[/green]")
-        else:
-            files_to_process = [str(input_path)]
+        return [input_path_str], True
 
-    # 3. Initialize Engines
-    ai = AIEngine(key)
-    processor = AudioProcessor()
+    input_path = Path(input_path_str)
+    if not input_path.exists():
+        raise FileNotFoundError(f"Input {input_path} not found.")
+        
+    if input_path.is_dir():
+        files_to_process = sorted(_walk_media(input_path_str))
+        console.print(f"[green]Found {len(files_to_process)} audio files in directory.[/green]")
+        return files_to_process, False
+    return [str(input_path)], False
 
-    # 4. Process Loop
-    success_count = 0
-    fail_count = 0
+# --- Job Server ---
+JOB_FLAGS = ("save_clean", "save_clean_audio", "save_transcript", "save_subs", "dry_run", "no_cache")
 
-    for current_input_target in files_to_process:
-        # Determine if current item is a YouTube URL
-        is_youtube = "youtube.com" in current_input_target or "youtu.be" in current_input_target
-        name_label = current_input_target if is_url_input else Path(current_input_target).name
-        console.rule(f"[bold blue]Processing {name_label} ({files_to_process.index(current_input_target)+1}/{len(files_to_process)})[/bold blue]")
-        
+async def _serve(socket_path: str, engine_options: Dict[str, Any], concurrency: int):
+    """Serves one JSON job per connection: a request line in, a result line out."""
+    # One limit for the whole server, so concurrent jobs cannot multiply it
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
         try:
-            _process_single_item_logic(
-                current_input_target=current_input_target,
+            job = orjson.loads(await reader.readline())
+            console.rule(f"[bold magenta]Job: {job.get('input')}[/bold magenta]")
+            files_to_process, is_url_input = _discover_inputs(job["input"])
+            out_path = _resolve_output_dir(job.get("output_dir"))
+            item_options = dict(
                 out_path=out_path,
-                ai=ai,
-                processor=processor,
-                model_size=model_size,
-                is_youtube=is_youtube, # Pass YouTube specific flag
-                # --- Action Flags ---
-                play=play,
-                play_audio=play_audio,
-                save_clean=save_clean,
-                save_clean_audio=save_clean_audio,
-                save_transcript=save_transcript,
-                save_subs=save_subs,
-                dry_run=dry_run
+                play=False,
+                play_audio=False,
+                **engine_options,
+                **{flag: bool(job.get(flag, False)) for flag in JOB_FLAGS},
             )
-            success_count += 1
+            success_count, fail_count = await _run_batch(files_to_process, is_url_input, concurrency, item_options, semaphore)
+            reply = {"processed": success_count, "failed": fail_count}
         except Exception as e:
-            console.print(f"[bold red]Failed to process {name_label}: {e}[/bold red]")
-            import traceback
-            traceback.print_exc()
+            console.print(f"[bold red]Job failed: {e}[/bold red]")
+            reply = {"error": str(e)}
+        writer.write(orjson.dumps(reply) + b"\n")
+        await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+
+    # Jobs choose their own output_dir, so only the owner may submit them. The mask
+    # makes bind() create the socket as 0600 already, with no window before a chmod.
+    old_umask = os.umask(0o177)
+    try:
+        server = await asyncio.start_unix_server(_handle, path=socket_path)
+    finally:
+        os.umask(old_umask)
+    console.print(f"[green]Listening on {socket_path}. Submit jobs with: INPUT --socket {socket_path}[/green]")
+    async with server:
+        await server.serve_forever()
+
+def _submit_job(socket_path: str, job: Dict[str, Any]) -> Dict[str, Any]:
+    """Sends a job to a running --serve process and waits for its result."""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(socket_path)
+            sock.sendall(orjson.dumps(job) + b"\n")
+            with sock.makefile("rb") as stream:
+                line = stream.readline()
+    except OSError as e:
+        return {"error": f"could not reach server at {socket_path}: {e}"}
+    if not line:
+        return {"error": "server closed the connection without a result"}
+    return orjson.loads(line)
+
+async def _run_batch(files_to_process: List[str], is_url_input: bool, concurrency: int, item_options: Dict[str, Any],
+                     semaphore: Optional[asyncio.Semaphore] = None) -> tuple:
+    """
+    Runs _process_single_item_logic for every input with up to `concurrency`
+    items in flight, so one file's LLM calls overlap another file's
+    transcription. Returns (success_count, fail_count). A shared semaphore
+    caps items in flight across several batches instead.
+    """
+    semaphore = semaphore or asyncio.Semaphore(concurrency)
+    total = len(files_to_process)
+
+    async def _run_item(index: int, current_input_target: str) -> bool:
+        name_label = current_input_target if is_url_input else Path(current_input_target).name
+        async with semaphore:
+            console.rule(f"[bold blue]Processing {name_label} ({index}/{total})[/bold blue]")
+            try:
+                # The pipeline is blocking (subprocesses, sync SDKs), so each item gets a worker thread
+                await asyncio.to_thread(
+                    _process_single_item_logic,
+                    current_input_target=current_input_target,
+                    **item_options
+                )
+                return True
+            except Exception as e:
+                console.print(f"[bold red]Failed to process {name_label}: {e}[/bold red]")
+                import traceback
+                traceback.print_exc()
+                return False
+
+    tasks = [_run_item(index, target) for index, target in enumerate(files_to_process, 1)]
+    success_count = 0
+    fail_count = 0
+    for finished in asyncio.as_completed(tasks):
+        if await finished:
+            success_count += 1
+        else:
             fail_count += 1
-            continue
+    return success_count, fail_count
 
-    console.rule("[bold green]Batch Complete[/bold green]")
-    console.print(f"Processed: {success_count} | Failed: {fail_count}")
+def _save_clean_media(
+    current_input_target: str,
+    actual_media_path: Optional[Path],
+    file_stem: str,
+    out_path: Path,
+    processor: "AudioProcessor",
+    segments_to_remove: List[Dict],
+    save_clean_audio: bool,
+    get_downloader=None, # URL inputs: returns the item's MediaDownloader
+):
+    """Writes the ad-free media file: MP3 for save_clean_audio, else the original format."""
+    # Resolve actual_media_path by downloading if it's a URL and not already downloaded
+    if get_downloader and not actual_media_path:
+        if save_clean_audio:
+            actual_media_path = Path(get_downloader().download_stream(current_input_target, format_mode='audio', custom_filename=file_stem))
+        else: # save_clean (video+audio)
+            actual_media_path = Path(get_downloader().download_stream(current_input_target, format_mode='video', custom_filename=file_stem))
+    
+    if not actual_media_path:
+        raise ValueError("Media path not resolved for cutting.")
+
+    final_media_output_path: Path
+    if save_clean_audio:
+        # Always output MP3 for clean audio
+        final_media_output_path = out_path / f"{file_stem}_clean.mp3" 
+        # If original media is not MP3, convert it before cutting
+        if actual_media_path.suffix.lower() not in ['.mp3', '.m4a', '.wav']: # Common audio formats
+            console.print(f"[cyan]Converting {actual_media_path.suffix} to MP3 for clean audio output...[/cyan]")
+            try:
+                # Decode, cut and encode in one ffmpeg pass (no temp MP3, no second lossy encode)
+                processor.cut_and_merge(
+                    str(actual_media_path), str(final_media_output_path), segments_to_remove,
+                    output_options={"acodec": "libmp3lame", "audio_bitrate": "192k"},
+                )
+            except Exception as e:
+                console.print(f"[red]Error converting to MP3 for save_clean_audio: {e}[/red]")
+                raise
+        else: # Already an audio file
+            processor.cut_and_merge(str(actual_media_path), str(final_media_output_path), segments_to_remove)
+    else: # save_clean (original format, or best video+audio for YouTube)
+        final_media_output_path = out_path / f"{file_stem}_clean{actual_media_path.suffix}"
+        processor.cut_and_merge(str(actual_media_path), str(final_media_output_path), segments_to_remove)
+    
+    console.print(f"[green]Clean media saved to {final_media_output_path.name}[/green]")
 
 # --- Core Logic for Single Item Processing ---
 def _process_single_item_logic(
     current_input_target: str,
     out_path: Path,
-    ai: AIEngine,
-    processor: AudioProcessor,
+    ai: "AIEngine",
+    processor: "AudioProcessor",
     model_size: str,
-    is_youtube: bool, # New flag to differentiate YouTube for SB
+    batch_size: Optional[int],
     # --- Action Flags ---
     play: bool,
     play_audio: bool,
@@ -321,23 +605,38 @@ def _process_single_item_logic(
     save_clean_audio: bool,
     save_transcript: bool,
     save_subs: bool,
-    dry_run: bool
+    dry_run: bool,
+    no_cache: bool = False
 ):
-    is_url = current_input_target.startswith("http") # True if any HTTP URL
     normalized_input = current_input_target.strip()
+    # is_youtube differentiates YouTube for SponsorBlock/captions
+    is_url, is_youtube, parsed_input = _classify_target(normalized_input)
     segments_to_remove: List[Dict] = []
     
+    import yt_dlp # For MediaDownloader's internal info extraction
+    from .media_downloader import MediaDownloader
+    from .player import Player
+
     transcript_json_path: Optional[str] = None # Path to Whisper/YT captions JSON
     actual_media_path: Optional[Path] = None # Path to local media file (downloaded or original)
     
     # --- Determine File Stem Candidates (stable + legacy) ---
-    file_stem_candidates = _build_candidate_stems(normalized_input, is_url=is_url, is_youtube=is_youtube)
+    file_stem_candidates = _build_candidate_stems(normalized_input, is_url=is_url, is_youtube=is_youtube, parsed=parsed_input)
     file_stem = file_stem_candidates[0] if file_stem_candidates else "generic_media_item"
 
     # Keep original path handy for local inputs
     if not is_url:
         actual_media_path = Path(normalized_input)
     
+    # One MediaDownloader per item, created on first use (URL inputs only)
+    md_loader: Optional[MediaDownloader] = None
+
+    def _md_loader() -> MediaDownloader:
+        nonlocal md_loader
+        if md_loader is None:
+            md_loader = MediaDownloader(output_dir=str(out_path))
+        return md_loader
+
     # Legacy YouTube stem (title-based) for cache reuse; only compute if needed
     legacy_title_stem: Optional[str] = None
 
@@ -360,55 +659,63 @@ def _process_single_item_logic(
     # --- Cache Discovery (primary + legacy stems) ---
     cache_candidates = [out_path / f"{stem}_analysis.json" for stem in file_stem_candidates]
 
-    def _load_first_existing(candidates: List[Path]) -> Optional[Path]:
+    def _read_first_existing(candidates: List[Path]) -> tuple:
+        """(path, raw bytes) of the first candidate that opens, else (None, None); one open() per probe, no stat()."""
         for candidate in candidates:
-            if candidate.exists():
-                return candidate
-        return None
-
-    found_cache = _load_first_existing(cache_candidates)
-
-    # Last-chance legacy: title-based youtube stem (only if nothing matched)
-    if not found_cache and is_url and is_youtube:
+            try:
+                with open(candidate, 'rb') as f:
+                    return candidate, f.read()
+            except FileNotFoundError:
+                continue
+        return None, None
+
+    found_cache, cache_bytes = _read_first_existing(cache_candidates) if not no_cache else (None, None)
+
+    # Last-chance legacy: title-based youtube stem (only if nothing matched, and only if
+    # title-named caches exist at all; the probe is a yt-dlp network roundtrip)
+    if not found_cache and not no_cache and is_url and is_youtube and _has_legacy_analysis(out_path):
         legacy_title = _try_legacy_ytdlp_stem()
         if legacy_title:
             legacy_path = out_path / f"{legacy_title}_analysis.json"
             file_stem_candidates.append(legacy_title)
             cache_candidates.append(legacy_path)
-            found_cache = _load_first_existing([legacy_path])
+            found_cache, cache_bytes = _read_first_existing([legacy_path])
+
+    # Local files are fingerprinted so an edited/replaced recording at the same path is re-analyzed
+    source_fingerprint = audio_fingerprint(normalized_input) if not is_url else None
 
     if found_cache:
         file_stem = found_cache.name.replace("_analysis.json", "")
         console.print(f"[yellow]Found cached analysis at {found_cache}. Using it.[/yellow]")
         try:
-            with open(found_cache, 'r') as f:
-                analysis = json.load(f)
+            analysis = orjson.loads(cache_bytes)
         except Exception:
             console.print("[red]Cache invalid, re-running AI...[/red]")
             analysis = None
+        # Caches written before fingerprints existed are trusted as before
+        cached_fingerprint = ((analysis or {}).get("input_meta") or {}).get("fingerprint")
+        if source_fingerprint and cached_fingerprint and cached_fingerprint != source_fingerprint:
+            console.print("[yellow]Source file changed since the cached analysis, re-running AI...[/yellow]")
+            analysis = None
     # Refresh cache_file to align with the resolved stem (primary or legacy)
     cache_file = out_path / f"{file_stem}_analysis.json"
 
     # --- Run Analysis if not in Cache ---
     if not analysis:
-        # Initialize MediaDownloader if URL
-        md_loader: Optional[MediaDownloader] = None
-        if is_url:
-            md_loader = MediaDownloader(output_dir=str(out_path))
-
         # STEP 1: Acquire Raw Transcript Segments (SponsorBlock bypasses this for AI)
-        if is_url and md_loader:
-            # A. SponsorBlock Check (Only for YouTube)
+        if is_url:
+            # A. SponsorBlock Check (Only for YouTube); captions, the AI fallback, come from
+            # the same yt-dlp extraction when SponsorBlock has nothing
+            captions_json_path: Optional[str] = None
             if is_youtube:
-                sb_segments = md_loader.get_sponsorblock_segments(current_input_target)
+                sb_segments, captions_json_path = _md_loader().fetch_sponsorblock_and_captions(current_input_target)
                 if sb_segments:
                     segments_to_remove = sb_segments
                     console.print("[green]Using SponsorBlock segments. Skipping AI analysis.[/green]")
             
             if not segments_to_remove: # If no SB segments or not YouTube, proceed to AI
-                # B. Gemini Fallback: Try to Download Captions (Only for YouTube)
-                if is_youtube:
-                    transcript_json_path = md_loader.download_captions(current_input_target)
+                # B. Gemini Fallback: Use the Downloaded Captions (Only for YouTube)
+                transcript_json_path = captions_json_path
                 
                 # C. Existing Local Transcript (Optimization)
                 if not transcript_json_path:
@@ -421,7 +728,7 @@ def _process_single_item_logic(
                 if not transcript_json_path:
                     console.print("[yellow]No suitable captions found. Downloading audio for Whisper...[/yellow]")
                     # Download audio for Whisper if no captions or not YouTube
-                    actual_media_path = Path(md_loader.download_stream(current_input_target, format_mode='audio', custom_filename=file_stem))
+                    actual_media_path = Path(_md_loader().download_stream(current_input_target, format_mode='audio', custom_filename=file_stem))
         else: # Local file, actual_media_path is already set
             pass # actual_media_path already set from input_path
 
@@ -435,13 +742,13 @@ def _process_single_item_logic(
                 transcript_json_path = processor.transcribe_local(
                     str(actual_media_path), 
                     model_size=model_size,
+                    batch_size=batch_size,
                     output_dir=str(out_path)
                 )
             
             # STEP 2: Semantic Analysis (Gemini)
             analysis_result = ai.analyze_transcript(transcript_json_path)
             segments_to_remove = analysis_result.get("segments_to_remove", [])
-            # We ignore 'transcript_segments' from AI now, as we build it locally
             
         # --- Save Analysis to Cache ---
         cache_payload = {
@@ -450,13 +757,14 @@ def _process_single_item_logic(
                 "is_url": is_url,
                 "is_youtube": is_youtube,
                 "file_stem": file_stem,
-                "schema_version": "v1"
+                "fingerprint": source_fingerprint,
+                # v2 dropped the always-empty "transcript_segments"; v1 caches read the same
+                "schema_version": "v2"
             },
-            "segments_to_remove": segments_to_remove,
-            "transcript_segments": []
+            "segments_to_remove": segments_to_remove
         }
-        with open(cache_file, 'w') as f:
-            json.dump(cache_payload, f, indent=2)
+        with open(cache_file, 'wb') as f:
+            f.write(orjson.dumps(cache_payload, option=orjson.OPT_INDENT_2))
     else:
         # Load segments from cache
         segments_to_remove = analysis.get("segments_to_remove", [])
@@ -469,16 +777,19 @@ def _process_single_item_logic(
         end_t = seg.get('end')
         console.print(f" - [red]{seg_type}[/red]: {start_t} -> {end_t}")
 
+    # Parsed and merged once for the Lua, SRT, transcript and Android player emitters
+    ad_spans = _ad_spans(segments_to_remove)
+
     # --- STEP 3: Default Outputs (Always Generated) ---
     # Generate and save _skips.lua
-    skips_lua_path = _generate_lua_script(file_stem, out_path, segments_to_remove)
+    skips_lua_path = _generate_lua_script(file_stem, out_path, ad_spans)
 
     # --- STEP 4: Conditional Actions based on Flags ---
     # --- Playback Actions ---
     if play or play_audio:
         player = Player()
         # For play, use the original input target (URL or local path)
-        player.play_with_skips(current_input_target, skips_lua_path, audio_only=play_audio, segments=segments_to_remove)
+        player.play_with_skips(current_input_target, skips_lua_path, audio_only=play_audio, ad_spans=ad_spans)
         return # Play mode finishes the process for this item
 
     # --- Dry Run ---
@@ -487,49 +798,8 @@ def _process_single_item_logic(
         return # Dry run finishes early, after generating default outputs
 
 
-    # --- Media Download / Processing for Save Flags ---
-    if save_clean or save_clean_audio:
-        # Resolve actual_media_path by downloading if it's a URL and not already downloaded
-        if is_url and not actual_media_path:
-            md_loader = MediaDownloader(output_dir=str(out_path))
-            if save_clean_audio:
-                actual_media_path = Path(md_loader.download_stream(current_input_target, format_mode='audio', custom_filename=file_stem))
-            else: # save_clean (video+audio)
-                actual_media_path = Path(md_loader.download_stream(current_input_target, format_mode='video', custom_filename=file_stem))
-        
-        if not actual_media_path:
-            raise ValueError("Media path not resolved for cutting.")
-
-        final_media_output_path: Path
-        if save_clean_audio:
-            # Always output MP3 for clean audio
-            final_media_output_path = out_path / f"{file_stem}_clean.mp3" 
-            # If original media is not MP3, convert it before cutting
-            if actual_media_path.suffix.lower() not in ['.mp3', '.m4a', '.wav']: # Common audio formats
-                console.print(f"[cyan]Converting {actual_media_path.suffix} to MP3 for clean audio output...[/cyan]")
-                temp_audio_path = out_path / f"{file_stem}_temp_audio.mp3"
-                try:
-                    (
-                        ffmpeg.input(str(actual_media_path))
-                        .output(str(temp_audio_path), acodec='libmp3lame', audio_bitrate='192k')
-                        .overwrite_output()
-                        .run(quiet=True)
-                    )
-                    processor.cut_and_merge(str(temp_audio_path), str(final_media_output_path), segments_to_remove)
-                    if temp_audio_path.exists():
-                        temp_audio_path.unlink()
-                except Exception as e:
-                    console.print(f"[red]Error converting to MP3 for save_clean_audio: {e}[/red]")
-                    raise
-            else: # Already an audio file
-                processor.cut_and_merge(str(actual_media_path), str(final_media_output_path), segments_to_remove)
-        else: # save_clean (original format, or best video+audio for YouTube)
-            final_media_output_path = out_path / f"{file_stem}_clean{actual_media_path.suffix}"
-            processor.cut_and_merge(str(actual_media_path), str(final_media_output_path), segments_to_remove)
-        
-        console.print(f"[green]Clean media saved to {final_media_output_path.name}[/green]")
-
     # --- Text Artifacts (Conditionally Saved) ---
+    write_text = None
     if save_transcript or save_subs:
         # We need transcript_json_path. If we loaded from cache, it might be None.
         if not transcript_json_path:
@@ -537,36 +807,24 @@ def _process_single_item_logic(
              if possible_path.exists():
                  transcript_json_path = str(possible_path)
         
-        if not transcript_json_path:
+        if not transcript_json_path or not os.path.exists(transcript_json_path):
              console.print("[yellow]No Whisper transcript found. Cannot generate text outputs.[/yellow]")
         else:
-            if save_transcript:
-                clean_transcript_path = out_path / f"{file_stem}_transcript.md"
-                with open(transcript_json_path, 'r') as f:
-                    whisper_data = json.load(f)
-                
-                transcript_text = ""
-                for w_seg in whisper_data.get("segments", []):
-                    w_text = w_seg.get("text", "").strip()
-                    if not w_text: continue
-                    
-                    midpoint = (w_seg.get("start", 0) + w_seg.get("end", 0)) / 2
-                    is_ad = False
-                    for r_seg in segments_to_remove:
-                        start_val = r_seg.get('start')
-                        end_val = r_seg.get('end')
-                        if start_val is None or end_val is None: continue
-                        if midpoint >= float(start_val) and midpoint <= float(end_val):
-                            is_ad = True
-                            break
-                    
-                    if not is_ad:
-                        transcript_text += f"{w_text}\n"
-                
-                with open(clean_transcript_path, "w") as f:
-                    f.write(f"# Transcript: {file_stem}\n\n")
-                    f.write(transcript_text)
-                console.print(f"[green]Clean transcript saved to {clean_transcript_path.name}[/green]")
+            write_text = partial(_write_text_artifacts, file_stem, out_path, transcript_json_path, ad_spans, save_transcript, save_subs)
 
-            if save_subs:
-                _generate_srt_file(file_stem, out_path, transcript_json_path, segments_to_remove)
+    # --- Media Download / Processing for Save Flags ---
+    if not (save_clean or save_clean_audio):
+        if write_text:
+            write_text()
+        return
+
+    # Text outputs only need the transcript and ad_spans, so they are written on a
+    # side thread while the media is downloaded and cut by ffmpeg
+    with ThreadPoolExecutor(max_workers=1) as text_pool:
+        text_future = text_pool.submit(write_text) if write_text else None
+        _save_clean_media(
+            current_input_target, actual_media_path, file_stem, out_path, processor, segments_to_remove,
+            save_clean_audio=save_clean_audio, get_downloader=_md_loader if is_url else None,
+        )
+    if text_future:
+        text_future.result()
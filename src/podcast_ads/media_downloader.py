@@ -1,153 +1,211 @@
+import copy
 import yt_dlp
-import json
+import orjson
 import os
-import subprocess
+import time
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from rich.console import Console
 
 console = Console()
 
+# SponsorBlock answers are cached per video; new community submissions show up after this
+SPONSORBLOCK_CACHE_TTL_SEC = 24 * 3600
+
 class MediaDownloader:
+    # Caption selection shared by the combined SponsorBlock/captions fetch
+    CAPTION_OPTS = {
+        'writeautomaticsub': True,
+        'writesubtitles': True,
+        'subtitleslangs': ['en.*', 'en'],
+        'subtitlesformat': 'json3',
+    }
+
     def __init__(self, output_dir: str = "./output"):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        # Info dicts from metadata-only extractions, by URL; a later download
+        # processes these instead of running the extractor a second time
+        self._info_cache: Dict[str, Dict[str, Any]] = {}
 
-    def get_sponsorblock_segments(self, url: str) -> List[Dict[str, Any]]:
+    def fetch_sponsorblock_and_captions(self, url: str) -> Tuple[List[Dict[str, Any]], Optional[str]]:
         """
-        Fetches SponsorBlock segments using yt-dlp CLI.
-        Returns list of dicts: {'start': float, 'end': float, 'type': str}
+        One yt-dlp extraction serves both sources: the SponsorBlock pre-processor annotates
+        the info dict, and on a SponsorBlock miss the selected json3 caption track is fetched
+        through the same session (no second extractor run, no yt-dlp subprocess).
+        Returns (sponsorblock_segments, captions_json_path or None).
         """
-        console.log("[cyan]Checking SponsorBlock database...[/cyan]")
-        cmd = [
-            "yt-dlp", 
-            "--dump-json", 
-            "--sponsorblock-mark", "all",
-            "--skip-download",
-            url
-        ]
-        try:
-            # Run quiet to avoid polluting stdout, capture json
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.returncode != 0:
-                return []
-                
-            # yt-dlp might output debug lines before JSON, look for the JSON blob
-            output = result.stdout
-            # Simple heuristic: parsing the last line usually works for dump-json
-            # or just parsing the whole thing if it's clean.
-            data = json.loads(output)
-            
-            chapters = data.get('sponsorblock_chapters', [])
-            if not chapters:
-                console.log("[dim]No SponsorBlock segments found.[/dim]")
-                return []
-                
-            segments = []
-            for chap in chapters:
-                segments.append({
-                    "start": chap['start_time'],
-                    "end": chap['end_time'],
-                    "type": chap['title'] # e.g. "Sponsor"
-                })
-            
-            console.print(f"[green]Found {len(segments)} segments via SponsorBlock![/green]")
-            return segments
-            
-        except Exception as e:
-            console.log(f"[dim]SponsorBlock check failed or empty: {e}[/dim]")
-            return []
+        cached = self._load_cached_sponsorblock(url)
+        if cached:
+            return cached, None
+        # Known miss with captions converted on an earlier run: nothing left to extract
+        if cached == [] and (captions_path := self._existing_captions(url)):
+            console.log(f"[green]Reusing converted captions: {Path(captions_path).name}[/green]")
+            return [], captions_path
 
-    def get_video_info(self, url: str) -> Dict[str, Any]:
-        """
-        Fetches metadata, subtitles, and sponsorblock info without downloading video.
-        """
         ydl_opts = {
+            **self.CAPTION_OPTS,
             'skip_download': True,
-            'writeautomaticsub': True,  # Prefer auto-subs if no manual
-            'writesub': True,
-            'subtitleslangs': ['en'],
-            'outtmpl': str(self.output_dir / '%(id)s'),
             'quiet': True,
             'no_warnings': True,
         }
-
-        console.log(f"[cyan]Fetching metadata for {url}...[/cyan]")
-        
+        # A cached miss still needs the extraction for captions, just not the SponsorBlock query
+        if cached is None:
+            console.log("[cyan]Checking SponsorBlock database...[/cyan]")
+            # SponsorBlock API failures are reported as warnings and leave the chapters unset
+            ydl_opts['postprocessors'] = [{'key': 'SponsorBlock', 'when': 'pre_process'}]
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             info = ydl.extract_info(url, download=False)
-            return info
+            self._remember_info(ydl, url, info)
+            segments = self._parse_sponsorblock(info)
+            if cached is None:
+                self._store_sponsorblock(url, info)
+            if segments:
+                console.print(f"[green]Found {len(segments)} segments via SponsorBlock![/green]")
+                return segments, None
+            console.log("[dim]No SponsorBlock segments found.[/dim]")
+            return [], self._save_requested_captions(ydl, info)
 
-    def download_captions(self, url: str) -> str:
+    @staticmethod
+    def list_playlist_entries(url: str) -> List[str]:
         """
-        Downloads captions and converts them to the JSON format our AIEngine expects.
-        Returns path to the JSON transcript.
+        Flat-extracts a playlist into its entries' URLs (no per-video extraction), so the
+        batch runner can process the videos concurrently, each with its own YoutubeDL.
         """
-        # We use write_auto_sub=True to ensure we get something
         ydl_opts = {
+            'extract_flat': 'in_playlist',
             'skip_download': True,
-            'writeautomaticsub': True,
-            'writesub': True,
-            'subtitleslangs': ['en.*', 'en'],
-            'subtitlesformat': 'json3', # Internal JSON format is easiest to parse
-            'outtmpl': str(self.output_dir / '%(id)s'),
-            'quiet': True
+            'quiet': True,
+            'no_warnings': True,
         }
-
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=True) # download=True needed to save subs
-            video_id = info['id']
-            
-            # Find the file
-            # yt-dlp might save as .en.json3 or .en.vtt depending on availability
-            # We look for the json3 file first
-            json_path = self.output_dir / f"{video_id}.en.json3"
-            
-            # If manual subs exist, it might be just .json3? 
-            # Let's look for any json3 file with the ID
-            found = list(self.output_dir.glob(f"{video_id}*.json3"))
-            
-            if not found:
-                # Fallback: Try VTT and convert? 
-                # Ideally json3 is best. Let's trust yt-dlp found something.
-                # If not, maybe no subs available.
-                console.print("[yellow]No subtitles found by yt-dlp.[/yellow]")
+            info = ydl.extract_info(url, download=False)
+        return [
+            entry.get('webpage_url') or entry['url']
+            for entry in info.get('entries') or []
+            if entry and (entry.get('webpage_url') or entry.get('url'))
+        ]
+
+    def _sponsorblock_cache_path(self, url: str) -> Optional[Path]:
+        """Cache file for the URL's YouTube video ID; None if the URL has none."""
+        from yt_dlp.extractor.youtube import YoutubeIE
+        if not YoutubeIE.suitable(url):
+            return None
+        return self.output_dir / ".sb_cache" / f"{YoutubeIE.extract_id(url)}.json"
+
+    def _existing_captions(self, url: str) -> Optional[str]:
+        """Captions converted earlier for the URL's video ID, if any."""
+        cache_path = self._sponsorblock_cache_path(url)
+        if cache_path is None:
+            return None
+        # One scandir pass with plain prefix/suffix tests; the output dir grows with every episode
+        prefix = f"{cache_path.stem}."
+        with os.scandir(self.output_dir) as entries:
+            found = sorted(e.path for e in entries if e.name.startswith(prefix) and e.name.endswith(".converted.json"))
+        return found[0] if found else None
+
+    def _load_cached_sponsorblock(self, url: str) -> Optional[List[Dict[str, Any]]]:
+        """Cached segments ([] for a known miss) if fresh, else None."""
+        cache_path = self._sponsorblock_cache_path(url)
+        if cache_path is None:
+            return None
+        try:
+            if time.time() - cache_path.stat().st_mtime >= SPONSORBLOCK_CACHE_TTL_SEC:
                 return None
-                
-            raw_sub_path = found[0]
+            segments = orjson.loads(cache_path.read_bytes())
+        except (OSError, orjson.JSONDecodeError):
+            return None
+        if segments:
+            console.print(f"[green]Found {len(segments)} segments via SponsorBlock (cached)![/green]")
+        else:
+            console.log("[dim]No SponsorBlock segments found (cached).[/dim]")
+        return segments
+
+    def _store_sponsorblock(self, url: str, info: Dict[str, Any]):
+        """Caches the lookup result; skipped when the lookup itself failed (no chapters key)."""
+        cache_path = self._sponsorblock_cache_path(url)
+        if cache_path is None or 'sponsorblock_chapters' not in info:
+            return
+        cache_path.parent.mkdir(exist_ok=True)
+        tmp_path = cache_path.with_suffix(".tmp")
+        tmp_path.write_bytes(orjson.dumps(self._parse_sponsorblock(info)))
+        os.replace(tmp_path, cache_path)
+
+    @staticmethod
+    def _parse_sponsorblock(info: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Maps yt-dlp's sponsorblock_chapters to {'start', 'end', 'type'} dicts."""
+        return [
+            {
+                "start": chap['start_time'],
+                "end": chap['end_time'],
+                "type": chap['title'] # e.g. "Sponsor"
+            }
+            for chap in info.get('sponsorblock_chapters') or []
+        ]
+
+    def _save_requested_captions(self, ydl: "yt_dlp.YoutubeDL", info: Dict[str, Any]) -> Optional[str]:
+        """Fetches the caption track yt-dlp selected in `info` and converts it; None if there is none."""
+        for lang, sub in (info.get('requested_subtitles') or {}).items():
+            if sub.get('ext') != 'json3':
+                continue
+            raw_sub_path = self.output_dir / f"{info['id']}.{lang}.json3"
+            converted_path = raw_sub_path.with_suffix('.converted.json')
+            # Converted on an earlier run: no need to fetch the track again
+            if converted_path.exists():
+                return str(converted_path)
+            raw = sub.get('data')
+            if raw is None:
+                with ydl.urlopen(sub['url']) as rsp:
+                    raw = rsp.read()
+            raw_sub_path.write_bytes(raw.encode("utf-8") if isinstance(raw, str) else raw)
             return self._convert_ytdlp_json_to_whisper_json(raw_sub_path)
+        console.print("[yellow]No subtitles found by yt-dlp.[/yellow]")
+        return None
+
+    def _remember_info(self, ydl: "yt_dlp.YoutubeDL", url: str, info: Dict[str, Any]):
+        # sanitize_info drops private/non-serializable keys, leaving what --load-info-json would accept
+        self._info_cache[url] = ydl.sanitize_info(info, remove_private_keys=True)
+
+    def _download_info(self, ydl: "yt_dlp.YoutubeDL", url: str) -> Dict[str, Any]:
+        """
+        Downloads url, reusing an info dict extracted earlier for it when there is one
+        (format selection and the download run off it, the extractor does not rerun).
+        Falls back to a fresh extraction if the reuse fails, e.g. expired format URLs.
+        """
+        cached = self._info_cache.get(url)
+        if cached is not None:
+            try:
+                return ydl.process_ie_result(copy.deepcopy(cached), download=True)
+            except yt_dlp.utils.DownloadError as e:
+                console.log(f"[dim]Reusing extracted info failed ({e}); extracting again...[/dim]")
+        return ydl.extract_info(url, download=True)
 
     def _convert_ytdlp_json_to_whisper_json(self, ytdlp_path: Path) -> str:
         """
         Converts yt-dlp's 'json3' format to the structure our AIEngine expects:
         { "segments": [ {"start": 0.0, "end": 1.0, "text": "..."} ] }
         """
-        with open(ytdlp_path, 'r') as f:
-            data = json.load(f)
-            
-        whisper_segments = []
-        events = data.get('events', [])
+        data = orjson.loads(ytdlp_path.read_bytes())
         
-        for event in events:
-            # yt-dlp json3 format: { "tStartMs": 1000, "dDurationMs": 2000, "segs": [{"utf8": "text"}] }
-            if 'segs' not in event: continue
-            
-            text = "".join([s.get('utf8', '') for s in event['segs']]).strip()
-            if not text: continue
-            
-            start_sec = event.get('tStartMs', 0) / 1000.0
-            duration_sec = event.get('dDurationMs', 0) / 1000.0
-            end_sec = start_sec + duration_sec
-            
+        # yt-dlp json3 format: { "tStartMs": 1000, "dDurationMs": 2000, "segs": [{"utf8": "text"}] }
+        whisper_segments = []
+        for event in data.get('events', ()):
+            if 'segs' not in event:
+                continue
+            text = "".join(s.get('utf8', '') for s in event['segs']).strip()
+            if not text:
+                continue
+            start_ms = event.get('tStartMs', 0)
             whisper_segments.append({
-                "start": start_sec,
-                "end": end_sec,
-                "text": text
+                "start": start_ms / 1000.0,
+                "end": (start_ms + event.get('dDurationMs', 0)) / 1000.0,
+                "text": text,
             })
+        del data  # the raw events are usually several times the size of the result
             
         output_path = ytdlp_path.with_suffix('.converted.json')
-        with open(output_path, 'w') as f:
-            json.dump({"segments": whisper_segments}, f, indent=2)
+        # Compact: only read back by the analysis/ijson readers
+        output_path.write_bytes(orjson.dumps({"segments": whisper_segments}))
             
         console.log(f"[green]Converted captions to {output_path.name}[/green]")
         return str(output_path)
@@ -184,7 +242,7 @@ class MediaDownloader:
             })
 
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=True)
+            info = self._download_info(ydl, url)
             filename = ydl.prepare_filename(info)
             if format_mode == 'audio':
                 # post-processor changes ext to mp3
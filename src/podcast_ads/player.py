@@ -1,18 +1,67 @@
+import hashlib
 import os
 import subprocess
 import shutil
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Optional
 from rich.console import Console
 
 console = Console()
 IS_ANDROID = "com.termux" in os.environ.get("PREFIX", "")
 
+def skip_script(ad_spans: List[tuple], target_media: Optional[str] = None) -> str:
+    """
+    Builds the MPV Lua script that skips ad_spans (merged, sorted (start, end) pairs).
+    With target_media the timer only acts while the playing path contains it, for
+    persistent scripts that mpv loads for every file (mpvKt on Android).
+    """
+    # Sorted by start, so the timer can walk an index forward instead of scanning every skip each tick
+    lua_skips = "".join(f"    {{ start = {start}, stop = {end} }},\n" for start, end in ad_spans)
+    guard = ""
+    if target_media is not None:
+        escaped = target_media.replace("\\", "\\\\").replace('"', '\\"')
+        guard = f"""
+    -- Guard: Check if current media matches our target
+    local path = mp.get_property("path")
+    if not path or not string.find(path, "{escaped}", 1, true) then return end
+"""
+    return f"local skips = {{\n{lua_skips}}}\n" + """
+-- Index of the first skip that has not ended yet; playback only moves it forward.
+-- After a seek it is found again by binary search (math.floor: mpv's Lua 5.1 has no //).
+local idx = 1
+local function first_unfinished(pos)
+    local lo, hi = 1, #skips
+    while lo <= hi do
+        local mid = math.floor((lo + hi) / 2)
+        if pos < skips[mid].stop then hi = mid - 1 else lo = mid + 1 end
+    end
+    return lo
+end
+mp.register_event("seek", function() idx = nil end)
+
+mp.add_periodic_timer(0.25, function()""" + guard + """
+    local pos = mp.get_property_number("time-pos")
+    if not pos then return end
+    
+    if not idx then idx = first_unfinished(pos) end
+    while idx <= #skips and pos >= skips[idx].stop do
+        idx = idx + 1
+    end
+    
+    local skip = skips[idx]
+    if skip and pos >= skip.start then
+        mp.set_property_number("time-pos", skip.stop)
+        mp.osd_message("Auto-Skipped Ad Section")
+        idx = idx + 1 -- Only skip one segment at a time
+    end
+end)
+"""
+
 class Player:
     def __init__(self):
         pass
 
-    def play_with_skips(self, media_path: str, script_path: str, audio_only: bool = False, segments: Optional[List[Dict]] = None):
+    def play_with_skips(self, media_path: str, script_path: str, audio_only: bool = False, ad_spans: Optional[List[tuple]] = None):
         """
         Plays the media (URL or file) using MPV.
         
@@ -20,10 +69,10 @@ class Player:
             media_path: URL or file path to play.
             script_path: Path to the generated Lua script (for PC).
             audio_only: Whether to disable video.
-            segments: Raw list of segments (Required for Android generation).
+            ad_spans: Merged (start_sec, end_sec) pairs from main._ad_spans (Required for Android generation).
         """
         if IS_ANDROID:
-            self._play_android(media_path, segments)
+            self._play_android(media_path, ad_spans)
         else:
             self._play_pc(media_path, script_path, audio_only)
 
@@ -47,9 +96,9 @@ class Player:
         except FileNotFoundError:
             console.print("[red]Error: 'mpv' player not found. Please install mpv.[/red]")
 
-    def _play_android(self, media_path: str, segments: List[Dict]):
-        if not segments:
-            console.print("[yellow]No segments provided for Android playback generation.[/yellow]")
+    def _play_android(self, media_path: str, ad_spans: List[tuple]):
+        if not ad_spans:
+            console.print("[yellow]No ad spans provided for Android playback generation.[/yellow]")
             return
 
         # Android Target: mpvKt config dir (Requires user setup)
@@ -69,48 +118,27 @@ class Player:
         else:
             target_name = Path(media_path).name
 
-        # Generate Android-specific Lua
-        lua_content = "local skips = {\n"
-        for seg in segments:
-            start = float(seg.get('start', 0))
-            end = float(seg.get('end', 0))
-            lua_content += f"    {{ start = {start}, stop = {end} }},\n"
-        lua_content += "}\n"
-        
-        lua_content += f"""
-local target_media = "{target_name}"
+        lua_content = skip_script(ad_spans, target_media=target_name)
 
-mp.add_periodic_timer(0.25, function()
-    -- Guard: Check if current media matches our target
-    local path = mp.get_property("path")
-    if not path then return end
-    
-    -- Simple string check (contains)
-    if not string.find(path, target_media, 1, true) then 
-        return 
-    end
-
-    local pos = mp.get_property_number("time-pos")
-    if not pos then return end
-    
-    for i, skip in ipairs(skips) do
-        if pos >= skip.start and pos < skip.stop then
-            mp.set_property_number("time-pos", skip.stop)
-            mp.osd_message("Auto-Skipped Ad")
-            break 
-        end
-    end
-end)
-"""
         # Use a unique name based on the target to allow persistent storage
         # Sanitize target_name for filesystem (keep alphanumeric, dots, dashes, underscores)
         safe_name = "".join(c for c in target_name if c.isalnum() or c in "._-")
         script_file = target_dir / f"{safe_name}_skips.lua"
         
-        with open(script_file, "w") as f:
-            f.write(lua_content)
-            
-        console.print(f"[green]Wrote persistent skip script to {script_file}[/green]")
+        # Repeat plays usually produce the same script; the hash header lets us skip the sdcard write
+        header = f"-- hash: {hashlib.blake2b(lua_content.encode('utf-8'), digest_size=8).hexdigest()}"
+        try:
+            with open(script_file, "r", encoding="utf-8") as f:
+                unchanged = f.readline().strip() == header
+        except OSError:
+            unchanged = False
+        
+        if unchanged:
+            console.print(f"[green]Skip script unchanged: {script_file}[/green]")
+        else:
+            with open(script_file, "w", encoding="utf-8") as f:
+                f.write(f"{header}\n{lua_content}")
+            console.print(f"[green]Wrote persistent skip script to {script_file}[/green]")
         # console.print(f"[dim]This script will auto-load in mpvKt for: {target_name}[/dim]")
 
         # Launch mpvKt
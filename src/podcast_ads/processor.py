@@ -1,33 +1,132 @@
+import atexit
 import ffmpeg
+import httpx
 import os
+import socket
 import sys
 import subprocess
-import json
-import shutil
-from typing import List, Dict
+import time
+import orjson
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Dict, Optional
 from pathlib import Path
-from .utils import parse_timestamp
+from .utils import parse_timestamp, fast_clone, enlarge_pipe
 from rich.console import Console
+from rich.progress import Progress
+
+# Optional PC transcription backend
+try:
+    from faster_whisper import WhisperModel, BatchedInferencePipeline
+    import ctranslate2 # faster-whisper's inference engine, installed with it
+    HAS_FASTER_WHISPER = True
+except ImportError:
+    HAS_FASTER_WHISPER = False
+
+# Optional pure-Python header reader for durations (saves an ffprobe fork per file)
+try:
+    import mutagen
+    HAS_MUTAGEN = True
+except ImportError:
+    HAS_MUTAGEN = False
 
 console = Console()
 
+# Per-segment fields kept in the transcript JSON (same layout whisper-ctranslate2 wrote)
+WHISPER_SEGMENT_FIELDS = (
+    "id", "seek", "start", "end", "text", "tokens",
+    "temperature", "avg_logprob", "compression_ratio", "no_speech_prob",
+)
+
 IS_ANDROID = "com.termux" in os.environ.get("PREFIX", "")
 
+# whisper.cpp model file per --model-size: q5 quantizations, which are good for mobile
+WHISPER_CPP_MODELS = {
+    "tiny": "ggml-tiny.en-q5_1.bin",
+    "small": "ggml-small.en-q5_1.bin",
+    "base": "ggml-base.en-q5_1.bin",
+    "medium": "ggml-medium.en-q5_0.bin", # Medium might be heavy
+}
+
+# whisper-server loads the model before it starts listening; medium can take a while on a phone
+WHISPER_SERVER_READY_TIMEOUT_SEC = 120
+# A long episode takes minutes to transcribe; past this the server is presumed hung
+# and the whisper-cli pipe takes over
+WHISPER_SERVER_INFERENCE_TIMEOUT_SEC = 2 * 3600
+
+# Audio containers whose packets can be cut and concatenated without re-encoding
+STREAM_COPY_SUFFIXES = frozenset({'.mp3', '.m4a', '.aac', '.opus', '.ogg', '.flac', '.wav'})
+
+@lru_cache(maxsize=128)
+def _probe_duration(input_path: str, mtime_ns: int, size: int) -> float:
+    """
+    Container duration, from the file header via mutagen when it is exact there, else ffprobe.
+    mtime/size are only cache keys, so a rewritten file is probed again.
+    """
+    if HAS_MUTAGEN:
+        try:
+            info = getattr(mutagen.File(input_path), "info", None)
+        except mutagen.MutagenError:
+            info = None
+        # MP3s without a Xing/VBRI header ("sketchy") only have a bitrate-based estimate; a short
+        # estimate would drop the tail when cutting, so those still go to ffprobe
+        if info is not None and getattr(info, "length", 0) > 0 and not getattr(info, "sketchy", False):
+            return float(info.length)
+    probe = ffmpeg.probe(input_path)
+    return float(probe['format']['duration'])
+
+@lru_cache(maxsize=1)
+def _whisper_device() -> tuple:
+    """(device, compute_type) for faster-whisper: fp16 on a CUDA GPU when one is visible, else int8 CPU."""
+    try:
+        if ctranslate2.get_cuda_device_count() > 0:
+            return "cuda", "float16"
+    except Exception: # CPU-only CTranslate2 builds / broken CUDA installs
+        pass
+    return "cpu", "int8"
+
+def _usable_cpus() -> int:
+    """CPUs this process may run on (respects taskset/cgroup affinity, unlike os.cpu_count)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError: # not available on macOS/Windows
+        return os.cpu_count() or 1
+
+def _whisper_threads(cap: int) -> int:
+    """Whisper CPU threads: every usable CPU up to `cap` (gains flatten past ~8, and big.LITTLE phones past 4)."""
+    return max(1, min(cap, _usable_cpus()))
+
+def _default_batch_size(device: str) -> int:
+    """Batch size when --batch-size is not given: 16 on a GPU, about one window per physical core on CPU."""
+    if device == "cuda":
+        return 16
+    return min(16, max(1, _usable_cpus() // 2))
+
 class AudioProcessor:
     def __init__(self):
-        pass
+        # Whisper already uses every core it is given, and its progress bar is a rich
+        # live display (one allowed at a time), so batch items transcribe in turn.
+        self._transcribe_lock = threading.Lock()
+        # Loaded Whisper pipelines by model size, reused across a batch
+        self._models = {}
+        # Android: (process, model_path, base_url) of the warm whisper-server, started on first use
+        self._whisper_server = None
+        # No-op unless a server was started; registered once rather than per (re)start
+        atexit.register(self._stop_whisper_server)
 
     def get_duration(self, input_path: str) -> float:
         try:
-            probe = ffmpeg.probe(input_path)
-            return float(probe['format']['duration'])
+            st = os.stat(input_path)
+            return _probe_duration(input_path, st.st_mtime_ns, st.st_size)
         except ffmpeg.Error as e:
             console.print(f"[red]Error probing file: {e.stderr}[/red]")
             raise
 
-    def transcribe_local(self, input_path: str, model_size: str = "tiny", output_dir: str = ".") -> str:
+    def transcribe_local(self, input_path: str, model_size: str = "tiny", output_dir: str = ".", batch_size: Optional[int] = None) -> str:
         """
-        Transcribes audio locally using whisper-ctranslate2 (PC) or whisper.cpp (Android).
+        Transcribes audio locally using faster-whisper (PC) or whisper.cpp (Android).
         Returns the path to the generated JSON transcript file.
         """
         input_p = Path(input_path)
@@ -39,50 +138,71 @@ class AudioProcessor:
              console.log(f"[yellow]Found existing transcript at {expected_json}, skipping Whisper.[/yellow]")
              return str(expected_json)
 
-        if IS_ANDROID:
-            return self._transcribe_android(input_path, model_size, str(expected_json))
-        else:
-            return self._transcribe_pc(input_path, model_size, output_dir, expected_json)
+        with self._transcribe_lock:
+            if IS_ANDROID:
+                return self._transcribe_android(input_path, model_size, str(expected_json))
+            else:
+                return self._transcribe_pc(input_path, model_size, output_dir, expected_json, batch_size)
 
-    def _transcribe_pc(self, input_path, model_size, output_dir, expected_json):
-        # Check if binary exists
-        if shutil.which("whisper-ctranslate2") is None:
-             console.print("[red]Error: 'whisper-ctranslate2' not found.[/red]")
+    def load_model(self, model_size: str):
+        """
+        Returns a batched faster-whisper pipeline for `model_size`, loading the
+        weights only on first use so a batch pays the load cost once.
+        """
+        pipeline = self._models.get(model_size)
+        if pipeline is None:
+            device, compute_type = _whisper_device()
+            console.log(f"[cyan]Loading Whisper model ({model_size}, {device} {compute_type})...[/cyan]")
+            model = WhisperModel(model_size, device=device, compute_type=compute_type, cpu_threads=_whisper_threads(8))
+            pipeline = self._models[model_size] = BatchedInferencePipeline(model=model)
+        return pipeline
+
+    def _transcribe_pc(self, input_path, model_size, output_dir, expected_json, batch_size=None):
+        if not HAS_FASTER_WHISPER:
+             console.print("[red]Error: 'faster-whisper' not installed.[/red]")
              console.print("[yellow]Please run: uv sync --extra pc[/yellow]")
-             raise FileNotFoundError("whisper-ctranslate2 binary missing")
+             raise ImportError("faster-whisper missing")
+
+        # Callers hold _transcribe_lock, so the shared model is never used concurrently
+        pipeline = self.load_model(model_size)
+        if not batch_size:
+            batch_size = _default_batch_size(_whisper_device()[0])
 
         console.log(f"[cyan]Starting local transcription with Whisper ({model_size})...[/cyan]")
-        console.log("[dim]Settings: int8, beam=1, batch=4, vad=True[/dim]")
+        console.log(f"[dim]Settings: beam=1, batch={batch_size}, vad=True[/dim]")
         
-        cmd = [
-            "whisper-ctranslate2",
-            str(input_path),
-            "--model", model_size,
-            "--language", "en",
-            "--compute_type", "int8",
-            "--device", "cpu",
-            "--output_format", "json",
-            "--output_dir", str(output_dir),
-            "--threads", "4",
-            "--beam_size", "1",
-            "--batched", "True",
-            "--batch_size", "4",
-            "--vad_filter", "True"
-        ]
-        
-        try:
-            with console.status(f"[bold yellow]Transcribing locally...[/bold yellow]", spinner="bouncingBar"):
-                subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            
-            if expected_json.exists():
-                console.log(f"[green]Transcription complete: {expected_json}[/green]")
-                return str(expected_json)
-            else:
-                raise FileNotFoundError(f"Whisper finished but {expected_json} was not found.")
-                
-        except subprocess.CalledProcessError as e:
-            console.print(f"[red]Whisper Error:[/red] {e.stderr.decode() if e.stderr else str(e)}")
-            raise
+        # Progress is audio time covered: the bar pulses while VAD runs, then follows each segment's end
+        with Progress(console=console, transient=True) as progress:
+            task = progress.add_task("[bold yellow]Transcribing locally...[/bold yellow]", total=None)
+            segments, info = pipeline.transcribe(
+                str(input_path),
+                language="en",
+                beam_size=1,
+                # 30s windows decoded together; more is faster but needs more RAM
+                batch_size=batch_size,
+                vad_filter=True,
+            )
+            progress.update(task, total=info.duration)
+            # Segments are a lazy generator; decoding happens while iterating
+            rows = []
+            for seg in segments:
+                rows.append({field: getattr(seg, field) for field in WHISPER_SEGMENT_FIELDS})
+                progress.update(task, completed=seg.end)
+            segments = rows
+
+        final_data = {
+            "text": "".join(seg["text"] for seg in segments),
+            "segments": segments,
+            "language": info.language,
+        }
+        # Written atomically: an existing transcript is trusted on the next run
+        tmp_json = expected_json.with_suffix(".json.tmp")
+        with open(tmp_json, "wb") as f:
+            f.write(orjson.dumps(final_data, option=orjson.OPT_INDENT_2))
+        os.replace(tmp_json, expected_json)
+
+        console.log(f"[green]Transcription complete: {expected_json}[/green]")
+        return str(expected_json)
 
     def _transcribe_android(self, input_path: str, model_size: str, output_json_path: str) -> str:
         """
@@ -107,22 +227,25 @@ class AudioProcessor:
                 whisper_bin = p
                 break
                 
-        # Map model size to q5_1 quantized models which are good for mobile
-        model_map = {
-            "tiny": "ggml-tiny.en-q5_1.bin",
-            "small": "ggml-small.en-q5_1.bin",
-            "base": "ggml-base.en-q5_1.bin",
-            "medium": "ggml-medium.en-q5_0.bin" # Medium might be heavy
-        }
-        model_fname = model_map.get(model_size, "ggml-tiny.en-q5_1.bin")
+        model_fname = WHISPER_CPP_MODELS.get(model_size, WHISPER_CPP_MODELS["tiny"])
         model_path = os.path.join(base_dir, "models", model_fname)
+        # A q4_0 quantization of the same model (made with whisper.cpp's quantize tool) is
+        # preferred when present: smaller weights, less memory bandwidth per decoder step
+        q4_path = os.path.join(base_dir, "models", f"{model_fname.rsplit('-', 1)[0]}-q4_0.bin")
+        if os.path.exists(q4_path):
+            model_path = q4_path
 
         if not whisper_bin:
             raise FileNotFoundError(f"Whisper binary not found in {base_dir}. Check build (CMake uses build/bin/).")
         if not os.path.exists(model_path):
             raise FileNotFoundError(f"Model not found at {model_path}. Please download it in whisper.cpp/models.")
 
-        console.log(f"[cyan]Starting Android transcription (whisper.cpp {model_size})...[/cyan]")
+        console.log(f"[cyan]Starting Android transcription (whisper.cpp {os.path.basename(model_path)})...[/cyan]")
+
+        # Prefer the warm server (model loaded once per run); the CLI pipe below is the fallback
+        segments = self._transcribe_via_server(base_dir, model_path, input_path)
+        if segments is not None:
+            return self._write_android_transcript(output_json_path, segments)
 
         # 1. FFmpeg Pipe Command
         ffmpeg_cmd = [
@@ -132,36 +255,38 @@ class AudioProcessor:
         ]
 
         # 2. Whisper Command
-        # -oj means output JSON to stdout? No, --output-json prints to stdout usually or file?
-        # The reference implementation captured stdout.
+        # --output-json writes <-of prefix>.json; the printed transcript on stdout is not needed
+        tmp_dir = tempfile.TemporaryDirectory(prefix="whisper_cpp_")
+        json_prefix = os.path.join(tmp_dir.name, "out")
         whisper_cmd = [
             whisper_bin,
             "-m", model_path,
-            "-t", "4",
+            "-t", str(_whisper_threads(4)),
             "-f", "-",            # Read from stdin
-            "--no-timestamps",    # Clean console output (we want JSON)
-            "--output-json"       # JSON format
+            "--no-timestamps",    # Clean console output
+            "--output-json",      # JSON format
+            "-of", json_prefix,
         ]
 
         try:
             with console.status("[bold yellow]Transcribing on Android (Pipe)...[/bold yellow]"):
                 # Chain processes
                 p1 = subprocess.Popen(ffmpeg_cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
-                p2 = subprocess.Popen(whisper_cmd, stdin=p1.stdout, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+                # The PCM flows child to child; a 1 MiB pipe means far fewer wakeups than 64 KiB
+                enlarge_pipe(p1.stdout.fileno())
+                p2 = subprocess.Popen(whisper_cmd, stdin=p1.stdout, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
                 p1.stdout.close()  # Allow p1 to receive SIGPIPE if p2 exits
                 
-                stdout, stderr = p2.communicate()
+                _, stderr = p2.communicate()
 
             if p2.returncode != 0:
-                raise RuntimeError(f"Whisper.cpp failed: {stderr}")
+                raise RuntimeError(f"Whisper.cpp failed: {stderr.decode(errors='replace')}")
 
             # 3. Normalize JSON
-            # Find the JSON start (skip headers)
-            json_start = stdout.find('{')
-            if json_start == -1:
-                raise ValueError("No JSON found in whisper output")
-            
-            raw_data = json.loads(stdout[json_start:])
+            try:
+                raw_data = orjson.loads(Path(f"{json_prefix}.json").read_bytes())
+            except FileNotFoundError:
+                raise ValueError("whisper.cpp wrote no JSON output")
             
             # Convert whisper.cpp format to our standard format
             # whisper.cpp: { "transcription": [ { "timestamps": { "from": "...", "to": "..." }, "text": "..." } ] }
@@ -182,39 +307,138 @@ class AudioProcessor:
                     "text": item.get("text", "").strip()
                 })
             
-            final_data = {"segments": segments}
-            
-            with open(output_json_path, "w") as f:
-                json.dump(final_data, f, indent=2)
-                
-            console.log(f"[green]Android Transcription complete: {output_json_path}[/green]")
-            return output_json_path
+            return self._write_android_transcript(output_json_path, segments)
 
         except Exception as e:
             console.print(f"[red]Android Transcription Error: {e}[/red]")
             raise
+        finally:
+            tmp_dir.cleanup()
+
+    def _write_android_transcript(self, output_json_path: str, segments: List[Dict]) -> str:
+        with open(output_json_path, "wb") as f:
+            f.write(orjson.dumps({"segments": segments}, option=orjson.OPT_INDENT_2))
+        console.log(f"[green]Android Transcription complete: {output_json_path}[/green]")
+        return output_json_path
+
+    def _whisper_server_url(self, base_dir: str, model_path: str) -> Optional[str]:
+        """
+        Base URL of a local whisper-server with model_path loaded, starting it on first
+        use. None when no server binary is built or it does not come up.
+        """
+        if self._whisper_server:
+            proc, loaded_model, url = self._whisper_server
+            if loaded_model == model_path and proc.poll() is None:
+                return url
+            self._stop_whisper_server()
+
+        server_bin = next((p for p in (
+            os.path.join(base_dir, "build", "bin", "whisper-server"),
+            os.path.join(base_dir, "build", "bin", "server"),
+            os.path.join(base_dir, "bin", "whisper-server"),
+            os.path.join(base_dir, "whisper-server"),
+        ) if os.path.exists(p)), None)
+        if not server_bin:
+            return None
+
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        console.log(f"[cyan]Starting whisper-server on port {port} (model stays loaded for this run)...[/cyan]")
+        proc = subprocess.Popen(
+            [server_bin, "-m", model_path, "-t", str(_whisper_threads(4)), "--host", "127.0.0.1", "--port", str(port)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + WHISPER_SERVER_READY_TIMEOUT_SEC
+        while True:
+            if proc.poll() is not None:
+                console.log(f"[yellow]whisper-server exited ({proc.returncode}), using whisper-cli.[/yellow]")
+                return None
+            try:
+                with socket.create_connection(("127.0.0.1", port), timeout=1):
+                    break
+            except OSError:
+                if time.monotonic() > deadline:
+                    proc.kill()
+                    console.log("[yellow]whisper-server did not start in time, using whisper-cli.[/yellow]")
+                    return None
+                time.sleep(0.2)
+
+        self._whisper_server = (proc, model_path, f"http://127.0.0.1:{port}")
+        return self._whisper_server[2]
+
+    def _stop_whisper_server(self):
+        if self._whisper_server:
+            proc = self._whisper_server[0]
+            self._whisper_server = None
+            proc.terminate()
+            try:
+                proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    def _transcribe_via_server(self, base_dir: str, model_path: str, input_path: str) -> Optional[List[Dict]]:
+        """Transcribes through whisper-server's /inference; None means use the CLI pipe instead."""
+        url = self._whisper_server_url(base_dir, model_path)
+        if url is None:
+            return None
+        try:
+            with tempfile.TemporaryDirectory(prefix="whisper_cpp_") as tmp:
+                wav_path = os.path.join(tmp, "in.wav")
+                ffmpeg.input(input_path).output(wav_path, ar=16000, ac=1, acodec="pcm_s16le").run(overwrite_output=True, quiet=True)
+                with open(wav_path, "rb") as wav, console.status("[bold yellow]Transcribing on Android (server)...[/bold yellow]"):
+                    rsp = httpx.post(
+                        f"{url}/inference",
+                        files={"file": ("in.wav", wav, "audio/wav")},
+                        data={"response_format": "verbose_json", "temperature": "0.0"},
+                        timeout=httpx.Timeout(10, read=WHISPER_SERVER_INFERENCE_TIMEOUT_SEC),
+                    )
+            rsp.raise_for_status()
+            return [
+                {"start": float(seg["start"]), "end": float(seg["end"]), "text": seg.get("text", "").strip()}
+                for seg in orjson.loads(rsp.content)["segments"]
+            ]
+        except httpx.TimeoutException as e:
+            # Do not reuse a server that stopped answering
+            self._stop_whisper_server()
+            console.log(f"[yellow]whisper-server timed out ({e!r}), using whisper-cli.[/yellow]")
+            return None
+        except (OSError, ffmpeg.Error, httpx.HTTPError, orjson.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+            console.log(f"[yellow]whisper-server transcription failed ({e}), using whisper-cli.[/yellow]")
+            return None
 
-    def cut_and_merge(self, input_path: str, output_path: str, remove_segments: List[Dict]):
+    def cut_and_merge(self, input_path: str, output_path: str, remove_segments: List[Dict], output_options: Optional[Dict] = None):
         """
         Cuts out the 'remove_segments' and merges the remaining parts.
+        `output_options` are passed to ffmpeg's output (e.g. codec/bitrate), so a
+        format conversion can happen in the same pass as the cut.
         """
-        total_duration = self.get_duration(input_path)
-        
         if not remove_segments:
-            console.log("[green]No segments to remove. Skipping processing.[/green]")
+            if not output_options and Path(input_path).suffix.lower() == Path(output_path).suffix.lower():
+                console.log("[green]No segments to remove. Copying source as-is.[/green]")
+                fast_clone(input_path, output_path)
+            else:
+                console.log("[green]No segments to remove. Converting without cuts...[/green]")
+                try:
+                    ffmpeg.input(input_path).output(output_path, **(output_options or {})).run(overwrite_output=True, quiet=True)
+                except ffmpeg.Error as e:
+                    console.print(f"[red]FFmpeg error: {e.stderr.decode()}[/red]")
+                    raise
             return
+
+        total_duration = self.get_duration(input_path)
         
         # 1. Convert remove segments to "Keep Segments"
-        # Sort remove segments by start time
-        remove_segments.sort(key=lambda x: parse_timestamp(x['start']))
+        # Parse each timestamp once and sort a copy by start time (the caller's list is left as-is)
+        spans = sorted(
+            ((parse_timestamp(seg['start']), parse_timestamp(seg['end']), seg) for seg in remove_segments),
+            key=lambda span: span[0],
+        )
         
         keep_segments = []
         current_time = 0.0
         
-        for seg in remove_segments:
-            start_remove = parse_timestamp(seg['start'])
-            end_remove = parse_timestamp(seg['end'])
-            
+        for start_remove, end_remove, seg in spans:
             # Sanity checks
             if start_remove >= end_remove:
                 console.log(f"[yellow]Skipping invalid segment: {seg['start']} -> {seg['end']} (Start >= End)[/yellow]")
@@ -239,22 +463,30 @@ class AudioProcessor:
             console.print("[yellow]No content segments found to keep! Check your remove logic.[/yellow]")
             return
 
+        # Same container, no conversion: copy the kept packets instead of decoding/re-encoding
+        if not output_options and Path(input_path).suffix.lower() == Path(output_path).suffix.lower() \
+                and Path(input_path).suffix.lower() in STREAM_COPY_SUFFIXES:
+            try:
+                self._cut_stream_copy(input_path, output_path, keep_segments)
+                console.print(f"[green]Successfully created {output_path}[/green]")
+                return
+            except ffmpeg.Error as e:
+                console.log(f"[yellow]Stream-copy cut failed ({e.stderr.decode(errors='replace').strip()[-200:]}), re-encoding instead...[/yellow]")
+
         console.log(f"Constructing ffmpeg command for {len(keep_segments)} segments...")
         
-        # 2. Build FFmpeg filter complex
-        input_stream = ffmpeg.input(input_path)
-        streams = []
+        # 2. Build FFmpeg filter: one aselect over the decoded stream keeps frames inside any keep
+        # segment (instead of an atrim chain per segment plus concat), then asetpts closes the gaps
+        keep_expr = "+".join(f"between(t,{start!r},{end!r})" for start, end in keep_segments)
         
-        for start, end in keep_segments:
-            # Create a trim for each segment
-            # atrim operates on audio
-            trim = input_stream.filter('atrim', start=start, end=end).filter('asetpts', 'PTS-STARTPTS')
-            streams.append(trim)
-            
-        # 3. Concatenate
         try:
-            joined = ffmpeg.concat(*streams, v=0, a=1)
-            output = ffmpeg.output(joined, output_path)
+            joined = (
+                ffmpeg.input(input_path)
+                .audio # explicit [0:a] instead of leaving ffmpeg to match [0] to an audio stream
+                .filter('aselect', keep_expr)
+                .filter('asetpts', 'N/SR/TB')
+            )
+            output = ffmpeg.output(joined, output_path, **(output_options or {}))
             
             console.log("[cyan]Starting audio processing (cutting & merging)...[/cyan]")
             output.run(overwrite_output=True, quiet=True)
@@ -263,3 +495,37 @@ class AudioProcessor:
         except ffmpeg.Error as e:
             console.print(f"[red]FFmpeg error: {e.stderr.decode()}[/red]")
             raise
+
+    def _cut_stream_copy(self, input_path: str, output_path: str, keep_segments: List[tuple]):
+        """
+        Copies each keep segment's audio packets into a part file (-c copy, no decode),
+        cutting the parts in parallel, then joins them with the concat demuxer. Cuts land on codec frame
+        boundaries (~26 ms for MP3), and nothing is re-encoded.
+        """
+        console.log(f"[cyan]Stream-copying {len(keep_segments)} segments (no re-encode)...[/cyan]")
+        suffix = Path(output_path).suffix
+        # Parts live next to the output so the final concat reads from the same disk
+        with tempfile.TemporaryDirectory(prefix=".cut_", dir=Path(output_path).parent) as tmp_dir:
+            part_paths = [os.path.join(tmp_dir, f"part_{i:04d}{suffix}") for i in range(len(keep_segments))]
+
+            def _cut_part(i: int):
+                start, end = keep_segments[i]
+                (
+                    ffmpeg.input(input_path, ss=start, t=end - start)
+                    .output(part_paths[i], map="0:a", c="copy")
+                    .run(overwrite_output=True, quiet=True)
+                )
+
+            # Parts are independent ffmpeg processes, so threads are enough to run them side by side
+            with ThreadPoolExecutor(max_workers=min(len(keep_segments), os.cpu_count() or 1)) as pool:
+                list(pool.map(_cut_part, range(len(keep_segments))))
+
+            list_path = os.path.join(tmp_dir, "parts.txt")
+            with open(list_path, "w") as f:
+                # concat-list quoting: a literal ' is written as '\''
+                f.writelines("file '{}'\n".format(part.replace("'", "'\\''")) for part in part_paths)
+            (
+                ffmpeg.input(list_path, format="concat", safe=0)
+                .output(output_path, c="copy")
+                .run(overwrite_output=True, quiet=True)
+            )
@@ -1,3 +1,6 @@
+import hashlib
+import os
+import shutil
 from typing import Any
 
 def parse_timestamp(timestamp: Any) -> float:
@@ -14,17 +17,16 @@ def parse_timestamp(timestamp: Any) -> float:
     if not timestamp_str:
         return 0.0
     
-    parts = timestamp_str.split(':')
-    parts = [float(p) for p in parts]
-    
-    if len(parts) == 3:
-        return parts[0] * 3600 + parts[1] * 60 + parts[2]
-    elif len(parts) == 2:
-        return parts[0] * 60 + parts[1]
-    elif len(parts) == 1:
-        return parts[0]
-    else:
+    # Peel fields off the right with rpartition instead of building a split list
+    rest, sep, seconds = timestamp_str.rpartition(':')
+    if not sep:
+        return float(seconds)
+    hours, sep, minutes = rest.rpartition(':')
+    if not sep:
+        return float(minutes) * 60 + float(seconds)
+    if ':' in hours:
         raise ValueError(f"Invalid timestamp format: {timestamp_str}")
+    return float(hours) * 3600 + float(minutes) * 60 + float(seconds)
 
 def seconds_to_timestamp(seconds: float) -> str:
     """Converts seconds to HH:MM:SS string."""
@@ -36,3 +38,52 @@ def offset_timestamp(timestamp_str: str, offset_seconds: float) -> str:
     """Parses a timestamp, adds seconds, and returns the new string."""
     secs = parse_timestamp(timestamp_str)
     return seconds_to_timestamp(secs + offset_seconds)
+
+def audio_fingerprint(path: str, sample_bytes: int = 1 << 20) -> str:
+    """
+    Cheap content fingerprint: hashes the file size plus its first and last
+    `sample_bytes`, so a changed recording is noticed without reading it all.
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.blake2b(size.to_bytes(8, "little"), digest_size=16)
+    with open(path, "rb") as f:
+        digest.update(f.read(sample_bytes))
+        if size > sample_bytes:
+            f.seek(max(sample_bytes, size - sample_bytes))
+            digest.update(f.read(sample_bytes))
+    return digest.hexdigest()
+
+def fast_clone(src: str, dst: str) -> None:
+    """
+    Copies src to dst, letting the kernel do it where possible
+    (copy_file_range reflinks on btrfs/XFS and avoids userspace buffers
+    elsewhere). Falls back to shutil.copy2. Hardlinks are deliberately not
+    used: a later ffmpeg run overwriting dst would truncate the source too.
+    """
+    if hasattr(os, "copy_file_range"):
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            if remaining == 0:
+                shutil.copystat(src, dst)
+                return
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
+
+def enlarge_pipe(fd: int, size: int = 1 << 20) -> None:
+    """
+    Raises a pipe's kernel buffer (default 64 KiB on Linux) so a streaming
+    producer/consumer pair wakes each other less often. Best effort: a no-op
+    off Linux/Android or above /proc/sys/fs/pipe-max-size.
+    """
+    try:
+        import fcntl
+        fcntl.fcntl(fd, fcntl.F_SETPIPE_SZ, size)
+    except (ImportError, AttributeError, OSError):
+        pass
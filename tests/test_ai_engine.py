@@ -0,0 +1,306 @@
+import asyncio
+
+import orjson
+import pytest
+
+from podcast_ads import ai_engine
+from podcast_ads.ai_engine import AIEngine, _balanced_end, _extract_json_array, _salvage_array_items, _stream_state, _StreamScanner
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    for var in ("GEMINI_API_KEY", "OPENROUTER_API_KEY", "AI_MODEL_ORDER"):
+        monkeypatch.delenv(var, raising=False)
+    monkeypatch.setenv("PODCAST_ADS_NO_CACHE", "1")
+    return AIEngine()
+
+
+AD = {"type": "ad", "start": 450.2, "end": 480.0}
+
+
+# --- _balanced_end ---
+
+@pytest.mark.parametrize("text, start, end", [
+    ("[1, 2]", 0, 5),
+    ('{"a": [1, {"b": "]"}]} tail', 0, 21),
+    ('x [[], {}] y', 2, 9),
+    ('["\\\\", "\\"]"]', 0, 12),
+])
+def test_balanced_end_finds_matching_bracket(text, start, end):
+    assert _balanced_end(text, start) == end
+    assert text[end] in "]}"
+
+
+@pytest.mark.parametrize("text", ["[1, 2", '{"a": "}"', '["\\"]'])
+def test_balanced_end_unclosed(text):
+    assert _balanced_end(text, 0) is None
+
+
+# --- _extract_json_array ---
+
+def test_extract_json_array_keeps_nested_lists():
+    text = 'note {"segments_to_remove": [{"start": 1, "end": 2, "tags": [1, [2]]}], "x": 1} tail'
+    assert _extract_json_array(text, "segments_to_remove") == [{"start": 1, "end": 2, "tags": [1, [2]]}]
+
+
+def test_extract_json_array_ignores_brackets_in_strings():
+    text = '{"segments_to_remove": [{"text": "a ] b [ \\" ]"}]} trailing ]'
+    assert _extract_json_array(text, "segments_to_remove") == [{"text": 'a ] b [ " ]'}]
+
+
+@pytest.mark.parametrize("text", [
+    '{"other": [1]}',
+    '{"segments_to_remove": 5}',
+    '{"segments_to_remove": [{"start": 1}',
+    '{"segments_to_remove": [{"start": 1,}]}',
+])
+def test_extract_json_array_returns_none(text):
+    assert _extract_json_array(text, "segments_to_remove") is None
+
+
+# --- _salvage_array_items ---
+
+AD2 = {"type": "ad", "start": 900.0, "end": 930.5}
+A, B = orjson.dumps(AD).decode(), orjson.dumps(AD2).decode()
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"segments_to_remove": [%s, %s, {"type": "a' % (A, B), [AD, AD2]),
+    ('{"segments_to_remove": [%s, %s,]}' % (A, B), [AD, AD2]),
+    ('{"segments_to_remove": [%s %s]}' % (A, B), [AD]),
+    ('[%s, {"start": 1' % A, [AD]),
+])
+def test_salvage_array_items_keeps_complete_items(text, expected):
+    assert _salvage_array_items(text, "segments_to_remove") == expected
+
+
+@pytest.mark.parametrize("text", ['{"other": [1]}', '{"segments_to_remove": [{"start": ', "no json here"])
+def test_salvage_array_items_returns_none(text):
+    assert _salvage_array_items(text, "segments_to_remove") is None
+
+
+@pytest.fixture
+def salvage_calls(monkeypatch):
+    calls = []
+
+    def spy(text, key):
+        result = _salvage_array_items(text, key)
+        calls.append(result)
+        return result
+    monkeypatch.setattr(ai_engine, "_salvage_array_items", spy)
+    return calls
+
+
+@pytest.mark.parametrize("text, finish_reason, expected", [
+    # Cut off by max_output_tokens mid-item
+    ('{"segments_to_remove": [%s, %s, {"type": "a' % (A, B), "length", [AD, AD2]),
+    # Prose preamble, then truncated
+    ('Here you go: {"segments_to_remove": [%s, {"start' % A, "length", [AD]),
+    # Bare list, truncated
+    ('[%s, %s, {"ty' % (A, B), "MAX_TOKENS", [AD, AD2]),
+    # Finished, but with a trailing or missing comma
+    ('```json\n{"segments_to_remove": [%s, %s,]}\n```' % (A, B), "stop", [AD, AD2]),
+    ('{"segments_to_remove": [%s %s]}' % (A, B), "stop", [AD]),
+])
+def test_check_and_parse_reaches_salvage(engine, salvage_calls, text, finish_reason, expected):
+    assert engine._check_and_parse(text, finish_reason, "stop") == {"segments_to_remove": expected}
+    assert salvage_calls == [expected]
+
+
+def test_well_formed_responses_do_not_reach_salvage(engine, salvage_calls):
+    engine._check_and_parse('{"segments_to_remove": [%s]}' % A, "stop", "stop")
+    engine._check_and_parse('Sure: {"segments_to_remove": [%s]} Done.' % A, "stop", "stop")
+    assert salvage_calls == []
+
+
+# --- _dedupe_overlap ---
+
+def _segs(*starts):
+    return [{"start": s, "end": s + 10, "text": f"t{s}"} for s in starts]
+
+
+def test_dedupe_overlap_drops_repeated_head(engine):
+    chunks = [_segs(0, 500, 550), _segs(550, 600, 1100), _segs(1100, 1200)]
+    assert engine._dedupe_overlap(chunks) == [_segs(0, 500, 550), _segs(600, 1100), _segs(1200)]
+
+
+def test_dedupe_overlap_drops_fully_repeated_chunk(engine):
+    chunks = [_segs(0, 540, 580), _segs(540, 580)]
+    assert engine._dedupe_overlap(chunks) == [_segs(0, 540, 580)]
+
+
+def test_dedupe_overlap_keeps_unrelated_and_empty_chunks(engine):
+    # Same start but a different end is a different segment
+    chunks = [_segs(0, 550), [{"start": 550, "end": 570, "text": "x"}], []]
+    assert engine._dedupe_overlap(chunks) == [_segs(0, 550), [{"start": 550, "end": 570, "text": "x"}]]
+
+
+# --- _parse_response ---
+
+@pytest.mark.parametrize("text", [
+    '{"segments_to_remove": [{"type": "ad", "start": 450.2, "end": 480.0}]}',
+    '[{"type": "ad", "start": 450.2, "end": 480.0}]',
+    '```json\n{"segments_to_remove": [{"type": "ad", "start": 450.2, "end": 480.0}]}\n```',
+    '"segments_to_remove": [{"type": "ad", "start": 450.2, "end": 480.0}]',
+    'Sure! Here are the ads:\n{"segments_to_remove": [{"type": "ad", "start": 450.2, "end": 480.0}]}\nHope that helps.',
+])
+def test_parse_response_recovers_segments(engine, text):
+    assert engine._parse_response(text) == {"segments_to_remove": [AD]}
+
+
+@pytest.mark.parametrize("text", ["", "I could not find any ads.", '{"segments_to_remove": ', '{"segments_to_remove": [}'])
+def test_parse_response_raises_on_garbage(engine, text):
+    with pytest.raises(ValueError):
+        engine._parse_response(text)
+
+
+# --- _check_and_parse ---
+
+@pytest.mark.parametrize("text, finish_reason, message", [
+    ("I cannot help with that.", "stop", "not JSON"),
+    ("", "length", "did not finish cleanly"),
+    ("{}", "stop", "no segments_to_remove"),
+    ('{"segments_to_remove": {"start": 1}}', "stop", "no segments_to_remove"),
+])
+def test_check_and_parse_rejects_unusable(engine, text, finish_reason, message):
+    with pytest.raises(RuntimeError, match=message):
+        engine._check_and_parse(text, finish_reason, "stop")
+
+
+# --- _group_chunks ---
+
+def test_group_chunks_caps_chunks_per_call(monkeypatch):
+    monkeypatch.setattr(ai_engine, "CHUNKS_PER_CALL", 2)
+    chunks = [[{"s": i, "e": i + 1, "t": "x"}] for i in range(5)]
+    groups = AIEngine._group_chunks(chunks)
+    assert [[num for num, _, _ in group] for group in groups] == [[1, 2], [3, 4], [5]]
+    assert groups[0][0][2] == orjson.dumps(chunks[0])
+
+
+def test_group_chunks_sends_oversized_chunk_alone(monkeypatch):
+    monkeypatch.setattr(ai_engine, "MAX_GROUP_PAYLOAD_BYTES", 100)
+    small = [{"s": 0, "e": 1, "t": "x"}]
+    big = [{"s": 1, "e": 2, "t": "y" * 200}]
+    groups = AIEngine._group_chunks([small, big, small, small])
+    assert [[num for num, _, _ in group] for group in groups] == [[1], [2], [3, 4]]
+
+
+# --- _stream_state ---
+
+@pytest.mark.parametrize("text, state", [
+    ("", "partial"),
+    ("``", "partial"),
+    ("```json\n", "partial"),
+    ('{"segments_to_remove": [', "partial"),
+    ('{"segments_to_remove": []}', "complete"),
+    ('```json\n[{"text": "}]"}]', "complete"),
+    ('[{"text": "}]', "partial"),
+    # Prose is read to the end rather than rejected
+    ("Here is the JSON you asked for", "partial"),
+    ('Here: {"segments_to_remove": []}', "partial"),
+])
+def test_stream_state(text, state):
+    assert _stream_state(text) == state
+
+
+def test_check_and_parse_accepts_prose_prefixed_reply(engine):
+    text = 'Sure, here you go:\n```json\n{"segments_to_remove": [{"type": "ad", "start": 450.2, "end": 480.0}]}\n```'
+    assert engine._check_and_parse(text, "stop", "stop") == {"segments_to_remove": [AD]}
+
+
+def test_check_and_parse_accepts_empty_result(engine):
+    assert engine._check_and_parse('{"segments_to_remove": []}', "STOP", "STOP") == {"segments_to_remove": []}
+
+
+# --- _run_group (via analyze_transcript_async) ---
+
+def test_failed_bundle_is_retried_one_chunk_at_a_time(engine, monkeypatch, tmp_path):
+    monkeypatch.setattr(ai_engine, "CHUNKS_PER_CALL", 4)
+    transcript = tmp_path / "episode.json"
+    # Six windows of 600s with a 540s step
+    transcript.write_bytes(orjson.dumps({"segments": _segs(*range(0, 3000, 100))}))
+    calls = []
+
+    async def fake_process(chunk_prompt, chunk_label, or_client=None, n_chunks=1):
+        calls.append((chunk_label, n_chunks))
+        if chunk_label == "1-4":
+            return {}  # e.g. the bundled answer was truncated
+        first = int(chunk_label.split("-")[0])
+        # Chunks 1 and 2 both report the ad on their shared boundary
+        return {"segments_to_remove": [{"type": "ad", "start": 500.0 + 40 * (first > 2), "end": 560.0}]}
+
+    monkeypatch.setattr(engine, "_process_chunk_with_fallbacks", fake_process)
+    result = asyncio.run(engine.analyze_transcript_async(str(transcript)))
+
+    assert ("1-4", 4) in calls
+    assert {label for label, n in calls if n == 1} == {"1", "2", "3", "4"}
+    assert ("5-6", 2) in calls
+    assert result == {"segments_to_remove": [
+        {"type": "ad", "start": 500.0, "end": 560.0},
+        {"type": "ad", "start": 540.0, "end": 560.0},
+    ]}
+
+
+# --- _build_chunks + _dedupe_overlap ---
+
+def test_build_chunks_then_dedupe_sends_each_segment_once(engine, tmp_path):
+    transcript = tmp_path / "episode.json"
+    transcript.write_bytes(orjson.dumps({"segments": _segs(*range(0, 1800, 30))}))
+    chunks = engine._dedupe_overlap(engine._build_chunks(str(transcript)))
+    starts = [seg["start"] for chunk in chunks for seg in chunk]
+    assert starts == list(range(0, 1800, 30))
+
+
+# --- _group_prompt ---
+
+def test_group_prompt_payload_matches_direct_dump():
+    chunks = [[{"s": 0, "e": 1, "t": "a"}], [{"s": 540, "e": 541, "t": "b"}]]
+    label, prompt = AIEngine._group_prompt(AIEngine._group_chunks(chunks)[0], 2)
+    assert label == "1-2"
+    payload = prompt.split("DATA:\n", 1)[1]
+    assert orjson.loads(payload) == {"chunks": [{"id": 1, "segs": chunks[0]}, {"id": 2, "segs": chunks[1]}]}
+
+
+# --- _StreamScanner ---
+
+REPLY = '```json\n{"segments_to_remove": [{"type": "ad", "text": "a \\"}\\\\", "start": 1, "end": 2}]}\n```'
+
+
+def _feed(pieces):
+    scanner = _StreamScanner()
+    return [scanner.feed(piece) for piece in pieces]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, len(REPLY)])
+def test_stream_scanner_split_anywhere(size):
+    pieces = [REPLY[i:i + size] for i in range(0, len(REPLY), size)]
+    closed_at = REPLY.index("]}") + 2
+    results = _feed(pieces)
+    first = results.index(True)
+    # Completes on the piece holding the closing brace, not before
+    assert sum(len(p) for p in pieces[:first]) < closed_at <= sum(len(p) for p in pieces[:first + 1])
+    assert all(results[first:])
+
+
+def test_stream_scanner_escape_split_across_pieces():
+    # The backslash ends one piece and the quote it escapes starts the next
+    assert _feed(['{"t": "a\\', '"}', '"}']) == [False, False, True]
+
+
+def test_stream_scanner_prose_never_completes():
+    assert _feed(["Sure", '! {"segments_to_remove": []}', "}"]) == [False, False, False]
+
+
+def test_stream_scanner_reads_each_piece_once(monkeypatch):
+    scanned = []
+    pattern = ai_engine._JSON_STRUCTURAL_RE
+
+    class CountingPattern:
+        def finditer(self, text, *args):
+            scanned.append(len(text))
+            return pattern.finditer(text, *args)
+    monkeypatch.setattr(ai_engine, "_JSON_STRUCTURAL_RE", CountingPattern())
+    segment = '{"type": "ad", "start": 1, "end": 2}, '
+    pieces = ['{"segments_to_remove": ['] + [segment] * 200 + ["]}"]
+    assert _feed(pieces)[-1] is True
+    assert sum(scanned) == sum(len(p) for p in pieces)
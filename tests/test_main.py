@@ -0,0 +1,60 @@
+import pytest
+
+from podcast_ads.main import _ad_span_checker, _ad_spans, _srt_timestamp
+
+
+def _seg(start, end):
+    return {"type": "ad", "start": start, "end": end}
+
+
+# --- _ad_spans ---
+
+def test_ad_spans_parses_and_sorts():
+    segments = [_seg("00:02:00", "00:02:30"), _seg(5, "0:10"), _seg("30.5", 40)]
+    assert _ad_spans(segments) == [(5.0, 10.0), (30.5, 40.0), (120.0, 150.0)]
+
+
+def test_ad_spans_skips_missing_bounds():
+    assert _ad_spans([_seg(None, 10), {"start": 5}, _seg(20, 30)]) == [(20.0, 30.0)]
+
+
+def test_ad_spans_merges_nested_and_overlapping():
+    segments = [_seg(0, 100), _seg(10, 20), _seg(30, 40), _seg(90, 110), _seg(110, 120), _seg(200, 210)]
+    assert _ad_spans(segments) == [(0.0, 120.0), (200.0, 210.0)]
+
+
+def test_ad_spans_ends_increase():
+    spans = _ad_spans([_seg(50, 60), _seg(0, 300), _seg(100, 120), _seg(400, 401), _seg(350, 500)])
+    assert spans == [(0.0, 300.0), (350.0, 500.0)]
+    ends = [end for _, end in spans]
+    assert ends == sorted(ends)
+
+
+# --- _ad_span_checker ---
+
+def test_ad_span_checker_nested_spans():
+    is_ad = _ad_span_checker(_ad_spans([_seg(0, 100), _seg(10, 20), _seg(30, 40)]))
+    assert [is_ad(t) for t in (0, 25, 50, 100)] == [True, True, True, True]
+    assert not is_ad(100.5)
+
+
+def test_ad_span_checker_gaps_and_edges():
+    is_ad = _ad_span_checker([(10.0, 20.0), (30.0, 40.0)])
+    assert [is_ad(t) for t in (5, 10, 20, 25, 30, 40, 41)] == [False, True, True, False, True, True, False]
+
+
+def test_ad_span_checker_no_spans():
+    assert not _ad_span_checker([])(0)
+
+
+# --- _srt_timestamp ---
+
+@pytest.mark.parametrize("seconds, expected", [
+    (0, "00:00:00,000"),
+    (1.5, "00:00:01,500"),
+    (59.9996, "00:01:00,000"),
+    (3725.042, "01:02:05,042"),
+    (0.1 + 0.2, "00:00:00,300"),
+])
+def test_srt_timestamp(seconds, expected):
+    assert _srt_timestamp(seconds) == expected
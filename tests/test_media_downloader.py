@@ -0,0 +1,191 @@
+import copy
+import io
+import os
+import time
+
+import orjson
+import pytest
+
+from podcast_ads import media_downloader
+from podcast_ads.media_downloader import MediaDownloader, SPONSORBLOCK_CACHE_TTL_SEC
+
+VIDEO_ID = "dQw4w9WgXcQ"
+URL = f"https://www.youtube.com/watch?v={VIDEO_ID}"
+CHAPTERS = [{"start_time": 12.0, "end_time": 34.5, "title": "Sponsor"}]
+SEGMENTS = [{"start": 12.0, "end": 34.5, "type": "Sponsor"}]
+JSON3 = orjson.dumps({"events": [
+    {"tStartMs": 1000, "dDurationMs": 1500, "segs": [{"utf8": "hello "}, {"utf8": "there"}]},
+    {"tStartMs": 2500, "dDurationMs": 500},  # no text
+    {"tStartMs": 3000, "dDurationMs": 500, "segs": [{"utf8": " \n"}]},
+]})
+
+
+class FakeYoutubeDL:
+    """Stands in for yt_dlp.YoutubeDL; every instance is recorded on the class."""
+    instances = []
+    info = {}
+
+    def __init__(self, opts):
+        self.opts = opts
+        self.opened = []
+        FakeYoutubeDL.instances.append(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def extract_info(self, url, download=False):
+        return copy.deepcopy(self.info)
+
+    def sanitize_info(self, info, remove_private_keys=False):
+        return info
+
+    def urlopen(self, url):
+        self.opened.append(url)
+        return io.BytesIO(JSON3)
+
+
+@pytest.fixture
+def ydl(monkeypatch):
+    FakeYoutubeDL.instances = []
+    FakeYoutubeDL.info = {"id": VIDEO_ID, "sponsorblock_chapters": CHAPTERS}
+    monkeypatch.setattr(media_downloader.yt_dlp, "YoutubeDL", FakeYoutubeDL)
+    return FakeYoutubeDL
+
+
+@pytest.fixture
+def downloader(tmp_path):
+    return MediaDownloader(str(tmp_path))
+
+
+def _cache_file(downloader):
+    return downloader.output_dir / ".sb_cache" / f"{VIDEO_ID}.json"
+
+
+def _write_cache(downloader, segments, age=0.0):
+    path = _cache_file(downloader)
+    path.parent.mkdir(exist_ok=True)
+    path.write_bytes(segments if isinstance(segments, bytes) else orjson.dumps(segments))
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+# --- SponsorBlock cache ---
+
+def test_lookup_is_cached(downloader, ydl):
+    assert downloader.fetch_sponsorblock_and_captions(URL) == (SEGMENTS, None)
+    assert ydl.instances[0].opts["postprocessors"] == [{"key": "SponsorBlock", "when": "pre_process"}]
+    assert orjson.loads(_cache_file(downloader).read_bytes()) == SEGMENTS
+
+
+def test_fresh_hit_skips_extraction(downloader, ydl):
+    _write_cache(downloader, SEGMENTS, age=SPONSORBLOCK_CACHE_TTL_SEC - 60)
+    assert downloader.fetch_sponsorblock_and_captions(URL) == (SEGMENTS, None)
+    assert ydl.instances == []
+
+
+def test_stale_entry_is_extracted_again(downloader, ydl):
+    path = _write_cache(downloader, [{"start": 1.0, "end": 2.0, "type": "Old"}], age=SPONSORBLOCK_CACHE_TTL_SEC + 60)
+    assert downloader.fetch_sponsorblock_and_captions(URL) == (SEGMENTS, None)
+    assert len(ydl.instances) == 1
+    assert orjson.loads(path.read_bytes()) == SEGMENTS
+    assert time.time() - path.stat().st_mtime < 60
+
+
+def test_corrupt_cache_file_is_ignored(downloader, ydl):
+    path = _write_cache(downloader, b'[{"start": 1.0, "end"')
+    assert downloader.fetch_sponsorblock_and_captions(URL) == (SEGMENTS, None)
+    assert len(ydl.instances) == 1
+    assert orjson.loads(path.read_bytes()) == SEGMENTS
+
+
+def test_failed_lookup_is_not_cached(downloader, ydl):
+    # The SponsorBlock API failing leaves sponsorblock_chapters unset
+    ydl.info = {"id": VIDEO_ID}
+    downloader.fetch_sponsorblock_and_captions(URL)
+    assert not _cache_file(downloader).exists()
+
+
+def test_non_youtube_urls_are_not_cached(downloader, ydl):
+    assert downloader.fetch_sponsorblock_and_captions("https://example.com/episode.mp3") == (SEGMENTS, None)
+    assert not (downloader.output_dir / ".sb_cache").exists()
+
+
+# --- Caption reuse ---
+
+SUBTITLES = {"en": {"ext": "json3", "url": "https://example.com/captions.json3"}}
+
+
+@pytest.fixture
+def no_sponsorblock(ydl):
+    ydl.info = {"id": VIDEO_ID, "sponsorblock_chapters": [], "requested_subtitles": copy.deepcopy(SUBTITLES)}
+    return ydl
+
+
+def _converted(downloader, lang="en"):
+    return downloader.output_dir / f"{VIDEO_ID}.{lang}.converted.json"
+
+
+def test_known_miss_reuses_converted_captions(downloader, no_sponsorblock):
+    _write_cache(downloader, [])
+    _converted(downloader).write_bytes(b'{"segments": []}')
+    assert downloader.fetch_sponsorblock_and_captions(URL) == ([], str(_converted(downloader)))
+    assert no_sponsorblock.instances == []
+
+
+def test_known_miss_without_captions_skips_the_sponsorblock_query(downloader, no_sponsorblock):
+    _write_cache(downloader, [])
+    assert downloader.fetch_sponsorblock_and_captions(URL) == ([], str(_converted(downloader)))
+    (instance,) = no_sponsorblock.instances
+    assert "postprocessors" not in instance.opts
+    assert instance.opened == [SUBTITLES["en"]["url"]]
+
+
+def test_converted_captions_are_reused_before_fetching(downloader, no_sponsorblock):
+    # SponsorBlock has to be asked (no cache), but the track itself is not refetched
+    _converted(downloader).write_bytes(b'{"segments": []}')
+    assert downloader.fetch_sponsorblock_and_captions(URL) == ([], str(_converted(downloader)))
+    (instance,) = no_sponsorblock.instances
+    assert instance.opened == []
+    assert not (downloader.output_dir / f"{VIDEO_ID}.en.json3").exists()
+
+
+def test_inline_caption_data_is_not_fetched(downloader, no_sponsorblock):
+    no_sponsorblock.info["requested_subtitles"]["en"]["data"] = JSON3.decode()
+    assert downloader.fetch_sponsorblock_and_captions(URL) == ([], str(_converted(downloader)))
+    assert no_sponsorblock.instances[0].opened == []
+
+
+def test_no_json3_track(downloader, no_sponsorblock):
+    no_sponsorblock.info["requested_subtitles"] = {"en": {"ext": "vtt", "url": "https://example.com/captions.vtt"}}
+    assert downloader.fetch_sponsorblock_and_captions(URL) == ([], None)
+
+
+def test_existing_captions_matches_this_video_only(downloader):
+    out = downloader.output_dir
+    for name in (f"{VIDEO_ID}x.en.converted.json", f"{VIDEO_ID}.en.json3", "other.en.converted.json",
+                 f"{VIDEO_ID}.fr.converted.json", f"{VIDEO_ID}.en.converted.json"):
+        (out / name).touch()
+    # Sorted, so the pick is stable; the id is matched up to its dot
+    assert downloader._existing_captions(URL) == str(out / f"{VIDEO_ID}.en.converted.json")
+    assert downloader._existing_captions("https://example.com/episode.mp3") is None
+
+
+def test_existing_captions_none_found(downloader):
+    (downloader.output_dir / f"{VIDEO_ID}.en.json3").touch()
+    assert downloader._existing_captions(URL) is None
+
+
+# --- json3 conversion ---
+
+def test_convert_json3_drops_events_without_text(downloader):
+    raw = downloader.output_dir / f"{VIDEO_ID}.en.json3"
+    raw.write_bytes(JSON3)
+    converted = downloader._convert_ytdlp_json_to_whisper_json(raw)
+    assert converted == str(_converted(downloader))
+    assert orjson.loads(_converted(downloader).read_bytes()) == {
+        "segments": [{"start": 1.0, "end": 2.5, "text": "hello there"}],
+    }
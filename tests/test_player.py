@@ -0,0 +1,68 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from podcast_ads import player
+from podcast_ads.player import Player, skip_script
+
+SPANS = [(0.0, 120.0), (200.0, 210.0)]
+
+
+# --- skip_script ---
+
+def test_skip_script_lists_spans_in_order():
+    script = skip_script([(0.0, 120.0), (200.0, 210.0)])
+    assert script.startswith("local skips = {\n    { start = 0.0, stop = 120.0 },\n    { start = 200.0, stop = 210.0 },\n}\n")
+    assert "mp.get_property(\"path\")" not in script
+
+
+def test_skip_script_guard_escapes_target():
+    script = skip_script([(1.0, 2.0)], target_media='a "b"\\c.mp3')
+    assert 'string.find(path, "a \\"b\\"\\\\c.mp3", 1, true)' in script
+
+
+# --- Android: persistent mpvKt script ---
+
+@pytest.fixture
+def launched(monkeypatch):
+    """Records each `am start` instead of running it."""
+    commands = []
+    monkeypatch.setattr(player.subprocess, "run", commands.append)
+    return commands
+
+
+@pytest.fixture
+def scripts_dir(launched, monkeypatch, tmp_path):
+    """Points the mpvKt scripts directory at tmp_path."""
+    monkeypatch.setattr(player, "Path", lambda p: tmp_path if p == "/storage/emulated/0/Videos/mpv_config/scripts" else Path(p))
+    return tmp_path
+
+
+def _play(spans):
+    Player()._play_android("/sdcard/Podcasts/episode.mp3", spans)
+
+
+def test_unchanged_script_is_not_rewritten(scripts_dir, launched):
+    _play(SPANS)
+    script = scripts_dir / "episode.mp3_skips.lua"
+    assert script.read_text().startswith("-- hash: ")
+    # Backdate it, so a rewrite would show even within the filesystem's mtime granularity
+    os.utime(script, (1_000_000_000, 1_000_000_000))
+
+    _play(SPANS)
+    assert script.stat().st_mtime == 1_000_000_000
+    assert len(launched) == 2
+
+
+def test_changed_spans_rewrite_the_script(scripts_dir):
+    _play(SPANS)
+    script = scripts_dir / "episode.mp3_skips.lua"
+    before = script.read_text()
+    os.utime(script, (1_000_000_000, 1_000_000_000))
+
+    _play(SPANS + [(300.0, 330.0)])
+    assert script.stat().st_mtime != 1_000_000_000
+    after = script.read_text()
+    assert after.splitlines()[0] != before.splitlines()[0]
+    assert after.endswith(skip_script(SPANS + [(300.0, 330.0)], target_media="episode.mp3"))
@@ -0,0 +1,373 @@
+import contextlib
+import os
+import threading
+
+import ffmpeg
+import httpx
+import orjson
+import pytest
+
+from podcast_ads import processor as processor_module
+from podcast_ads.processor import AudioProcessor
+
+REMOVE = [{"start": "00:00:50", "end": 60}, {"start": 10, "end": "0:20"}]
+KEEP = [(0.0, 10.0), (20.0, 50.0), (60.0, 100.0)]
+
+
+class FakeFFmpeg:
+    """Replaces OutputStream.run: records each command line instead of spawning ffmpeg."""
+
+    def __init__(self):
+        self.commands = []
+        self.concat_lists = []
+        self.fail_when = lambda args: False
+
+    def __call__(self, stream_spec, **kwargs):
+        args = ffmpeg.get_args(stream_spec)
+        self.commands.append(args)
+        if "concat" in args:
+            with open(args[args.index("-i") + 1]) as f:
+                self.concat_lists.append(f.read())
+        if self.fail_when(args):
+            raise ffmpeg.Error("ffmpeg", b"", b"Invalid data found when processing input")
+        return b"", b""
+
+    def part_cuts(self):
+        return [args for args in self.commands if "-ss" in args]
+
+    def reencodes(self):
+        return [args for args in self.commands if "-filter_complex" in args]
+
+
+@pytest.fixture
+def fake_ffmpeg(monkeypatch):
+    fake = FakeFFmpeg()
+    # A plain function, so it binds to the stream like the real method
+    monkeypatch.setattr(ffmpeg.nodes.OutputStream, "run", lambda stream, **kwargs: fake(stream, **kwargs))
+    return fake
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    proc = AudioProcessor()
+    monkeypatch.setattr(proc, "get_duration", lambda path: 100.0)
+    return proc
+
+
+def _cut_span(args):
+    start = float(args[args.index("-ss") + 1])
+    return (start, start + float(args[args.index("-t") + 1]))
+
+
+# --- cut_and_merge: stream copy vs re-encode ---
+
+def test_same_format_is_stream_copied(processor, fake_ffmpeg, tmp_path):
+    out = tmp_path / "clean.mp3"
+    processor.cut_and_merge("episode.mp3", str(out), REMOVE)
+
+    cuts = fake_ffmpeg.part_cuts()
+    assert sorted(_cut_span(args) for args in cuts) == KEEP
+    for args in cuts:
+        assert args[args.index("-i") + 1] == "episode.mp3"
+        assert args[args.index("-c") + 1] == "copy"
+        assert args[args.index("-map") + 1] == "0:a"
+    assert fake_ffmpeg.reencodes() == []
+
+    concat = fake_ffmpeg.commands[-1]
+    assert concat[:4] == ["-f", "concat", "-safe", "0"]
+    assert concat[-3:] == ["-c", "copy", str(out)]
+    # The list names every part once, in keep order
+    listed = [line[len("file '"):-1] for line in fake_ffmpeg.concat_lists[0].splitlines()]
+    part_outputs = {_cut_span(args): args[-1] for args in cuts}
+    assert listed == [part_outputs[span] for span in KEEP]
+
+
+@pytest.mark.parametrize("output, options", [
+    ("clean.m4a", None),  # format conversion
+    ("clean.mp3", {"audio_bitrate": "96k"}),  # explicit encoding options
+])
+def test_conversion_is_reencoded(processor, fake_ffmpeg, tmp_path, output, options):
+    processor.cut_and_merge("episode.mp3", str(tmp_path / output), REMOVE, output_options=options)
+    assert fake_ffmpeg.part_cuts() == []
+    assert len(fake_ffmpeg.reencodes()) == 1
+
+
+def test_unlisted_container_is_reencoded(processor, fake_ffmpeg, tmp_path):
+    processor.cut_and_merge("episode.mkv", str(tmp_path / "clean.mkv"), REMOVE)
+    assert fake_ffmpeg.part_cuts() == []
+    assert len(fake_ffmpeg.reencodes()) == 1
+
+
+def test_stream_copy_failure_falls_back_to_reencode(processor, fake_ffmpeg, tmp_path):
+    fake_ffmpeg.fail_when = lambda args: "-ss" in args
+    out = tmp_path / "clean.mp3"
+    processor.cut_and_merge("episode.mp3", str(out), REMOVE)
+
+    assert fake_ffmpeg.part_cuts()
+    assert fake_ffmpeg.concat_lists == []
+    (reencode,) = fake_ffmpeg.reencodes()
+    assert reencode[-1] == str(out)
+    # The part files' temporary directory is cleaned up
+    assert [p.name for p in tmp_path.iterdir()] == []
+
+
+def test_reencode_failure_is_raised(processor, fake_ffmpeg, tmp_path):
+    fake_ffmpeg.fail_when = lambda args: True
+    with pytest.raises(ffmpeg.Error):
+        processor.cut_and_merge("episode.mp3", str(tmp_path / "clean.mp3"), REMOVE)
+
+
+def test_keep_spans_skip_invalid_and_clamp(processor, fake_ffmpeg, tmp_path):
+    remove = [
+        {"start": 30, "end": 20},  # start >= end
+        {"start": 150, "end": 160},  # past the end
+        {"start": 90, "end": 120},  # clamped to the duration
+        {"start": 0, "end": 5},
+        {"start": 4, "end": 8},  # overlaps the previous one
+    ]
+    processor.cut_and_merge("episode.mp3", str(tmp_path / "clean.mp3"), remove)
+    assert sorted(_cut_span(args) for args in fake_ffmpeg.part_cuts()) == [(8.0, 90.0)]
+
+
+# --- _cut_stream_copy: parallel part cuts ---
+
+def test_parts_are_cut_concurrently(processor, fake_ffmpeg, monkeypatch, tmp_path):
+    monkeypatch.setattr("os.cpu_count", lambda: 8)
+    # Every part cut waits for the others; run one at a time this would time out
+    barrier = threading.Barrier(len(KEEP), timeout=5)
+    record = fake_ffmpeg.__call__
+
+    def concurrent_run(stream, **kwargs):
+        if "-ss" in ffmpeg.get_args(stream):
+            barrier.wait()
+        return record(stream, **kwargs)
+    monkeypatch.setattr(ffmpeg.nodes.OutputStream, "run", concurrent_run)
+
+    processor.cut_and_merge("episode.mp3", str(tmp_path / "clean.mp3"), REMOVE)
+    assert len(fake_ffmpeg.part_cuts()) == len(KEEP)
+    assert len(fake_ffmpeg.concat_lists) == 1
+
+
+def test_parallel_cuts_capped_by_cpu_count(processor, fake_ffmpeg, monkeypatch, tmp_path):
+    monkeypatch.setattr("os.cpu_count", lambda: 1)
+    lock = threading.Lock()
+    record = fake_ffmpeg.__call__
+
+    def exclusive_run(stream, **kwargs):
+        # A second concurrent cut would find the lock taken
+        assert lock.acquire(blocking=False)
+        try:
+            return record(stream, **kwargs)
+        finally:
+            lock.release()
+    monkeypatch.setattr(ffmpeg.nodes.OutputStream, "run", exclusive_run)
+
+    processor.cut_and_merge("episode.mp3", str(tmp_path / "clean.mp3"), REMOVE)
+    assert sorted(_cut_span(args) for args in fake_ffmpeg.part_cuts()) == KEEP
+
+
+def test_one_failed_part_fails_the_copy(processor, fake_ffmpeg, tmp_path):
+    fake_ffmpeg.fail_when = lambda args: args[args.index("-ss") + 1] == "20.0" if "-ss" in args else False
+    processor.cut_and_merge("episode.mp3", str(tmp_path / "clean.mp3"), REMOVE)
+    assert fake_ffmpeg.concat_lists == []
+    assert len(fake_ffmpeg.reencodes()) == 1
+
+
+# --- re-encode filter graph ---
+
+def _filter_graph(args):
+    return args[args.index("-filter_complex") + 1]
+
+
+def test_reencode_uses_one_aselect_over_all_keep_spans(processor, fake_ffmpeg, tmp_path):
+    processor.cut_and_merge("episode.mp3", str(tmp_path / "clean.m4a"), REMOVE)
+    graph = _filter_graph(fake_ffmpeg.reencodes()[0])
+    between = "+".join(f"between(t\\,{start!r}\\,{end!r})" for start, end in KEEP)
+    assert f"aselect={between}[s0]" in graph
+    assert "asetpts=N/SR/TB" in graph
+    assert graph.count("aselect") == 1
+    assert "atrim" not in graph and "concat" not in graph
+
+
+def test_filter_graph_size_does_not_depend_on_span_count(processor, fake_ffmpeg, tmp_path):
+    remove = [{"start": i + 0.5, "end": i + 0.75} for i in range(50)]
+    processor.cut_and_merge("episode.mp3", str(tmp_path / "clean.m4a"), remove)
+    args = fake_ffmpeg.reencodes()[0]
+    assert _filter_graph(args).count(";") == 1
+    assert args.count("-i") == 1
+
+
+def test_reencode_reads_the_audio_stream_explicitly(processor, fake_ffmpeg, tmp_path):
+    processor.cut_and_merge("episode.mp4", str(tmp_path / "clean.mp3"), REMOVE)
+    assert _filter_graph(fake_ffmpeg.reencodes()[0]).startswith("[0:a]aselect=")
+
+
+# --- Android: whisper-server with the CLI pipe as fallback ---
+
+CLI_TRANSCRIPT = {"transcription": [{"timestamps": {"from": "00:00:01,000", "to": "00:00:02,500"}, "text": " from the cli"}]}
+SERVER_TRANSCRIPT = {"segments": [{"start": 1.0, "end": 2.5, "text": " from the server"}]}
+
+
+class FakeProcess:
+    """A spawned child: whisper-server never exits on its own, ffmpeg and whisper-cli finish at once."""
+
+    def __init__(self, args, **kwargs):
+        self.args = args
+        self.returncode = None
+        self.terminated = False
+        self.stdout = open(os.devnull, "rb") if kwargs.get("stdout") == processor_module.subprocess.PIPE else None
+
+    def poll(self):
+        return self.returncode
+
+    def terminate(self):
+        self.terminated = True
+        self.returncode = -15
+
+    kill = terminate
+
+    def wait(self, timeout=None):
+        return self.returncode
+
+    def communicate(self):
+        # whisper-cli --output-json writes <-of prefix>.json
+        with open(self.args[self.args.index("-of") + 1] + ".json", "wb") as f:
+            f.write(orjson.dumps(CLI_TRANSCRIPT))
+        self.returncode = 0
+        return None, b""
+
+
+@pytest.fixture
+def spawned(monkeypatch):
+    """Every Popen is recorded as a FakeProcess instead of run."""
+    processes = []
+
+    def popen(args, **kwargs):
+        processes.append(FakeProcess(args, **kwargs))
+        return processes[-1]
+    monkeypatch.setattr(processor_module.subprocess, "Popen", popen)
+    return processes
+
+
+@pytest.fixture
+def whisper_cpp(spawned, monkeypatch, tmp_path):
+    """A ~/whisper.cpp with whisper-cli and the tiny model."""
+    base_dir = tmp_path / "whisper.cpp"
+    (base_dir / "build" / "bin").mkdir(parents=True)
+    (base_dir / "build" / "bin" / "whisper-cli").touch()
+    (base_dir / "models").mkdir()
+    (base_dir / "models" / processor_module.WHISPER_CPP_MODELS["tiny"]).touch()
+    monkeypatch.setenv("HOME", str(tmp_path))
+    return base_dir
+
+
+@pytest.fixture
+def server_up(whisper_cpp, monkeypatch, fake_ffmpeg):
+    """Adds a whisper-server binary that starts listening at once; the wav conversion leaves an (empty) file."""
+    (whisper_cpp / "build" / "bin" / "whisper-server").touch()
+    monkeypatch.setattr(processor_module.socket, "create_connection", lambda address, timeout=None: contextlib.nullcontext())
+
+    def convert(stream, **kwargs):
+        open(ffmpeg.get_args(stream)[-1], "wb").close()
+        return fake_ffmpeg(stream, **kwargs)
+    monkeypatch.setattr(ffmpeg.nodes.OutputStream, "run", convert)
+    return whisper_cpp
+
+
+def _servers(spawned):
+    return [p for p in spawned if p.args[0].endswith("whisper-server")]
+
+
+def _cli_runs(spawned):
+    return [p for p in spawned if p.args[0].endswith("whisper-cli")]
+
+
+def _transcribe(tmp_path):
+    out = tmp_path / "episode.json"
+    AudioProcessor()._transcribe_android("episode.mp3", "tiny", str(out))
+    return orjson.loads(out.read_bytes())["segments"]
+
+
+def test_server_transcript_is_used(server_up, spawned, monkeypatch, tmp_path):
+    posted = []
+
+    def post(url, **kwargs):
+        posted.append((url, kwargs))
+        return httpx.Response(200, content=orjson.dumps(SERVER_TRANSCRIPT), request=httpx.Request("POST", url))
+    monkeypatch.setattr(processor_module.httpx, "post", post)
+
+    assert _transcribe(tmp_path) == [{"start": 1.0, "end": 2.5, "text": "from the server"}]
+    ((url, kwargs),) = posted
+    assert url.endswith("/inference")
+    # A hung server cannot stall the run forever
+    assert kwargs["timeout"].read == processor_module.WHISPER_SERVER_INFERENCE_TIMEOUT_SEC
+    assert _cli_runs(spawned) == []
+
+
+def test_no_server_binary_uses_the_cli(whisper_cpp, spawned, tmp_path):
+    assert _transcribe(tmp_path) == [{"start": 1.0, "end": 2.5, "text": "from the cli"}]
+    assert _servers(spawned) == []
+    assert len(_cli_runs(spawned)) == 1
+
+
+def test_server_that_never_listens_is_killed(server_up, spawned, monkeypatch, tmp_path):
+    def refuse(address, timeout=None):
+        raise ConnectionRefusedError(address)
+    monkeypatch.setattr(processor_module.socket, "create_connection", refuse)
+    monkeypatch.setattr(processor_module, "WHISPER_SERVER_READY_TIMEOUT_SEC", 0)
+
+    assert _transcribe(tmp_path) == [{"start": 1.0, "end": 2.5, "text": "from the cli"}]
+    (server,) = _servers(spawned)
+    assert server.terminated
+    assert len(_cli_runs(spawned)) == 1
+
+
+def test_unreachable_server_falls_back_to_the_cli(server_up, spawned, monkeypatch, tmp_path):
+    def post(url, **kwargs):
+        raise httpx.ConnectError("Connection refused")
+    monkeypatch.setattr(processor_module.httpx, "post", post)
+
+    assert _transcribe(tmp_path) == [{"start": 1.0, "end": 2.5, "text": "from the cli"}]
+    assert len(_cli_runs(spawned)) == 1
+
+
+def test_timed_out_server_is_stopped_and_the_cli_used(server_up, spawned, monkeypatch, tmp_path):
+    def post(url, **kwargs):
+        raise httpx.ReadTimeout("timed out")
+    monkeypatch.setattr(processor_module.httpx, "post", post)
+
+    proc = AudioProcessor()
+    out = tmp_path / "episode.json"
+    proc._transcribe_android("episode.mp3", "tiny", str(out))
+    assert orjson.loads(out.read_bytes())["segments"] == [{"start": 1.0, "end": 2.5, "text": "from the cli"}]
+    (server,) = _servers(spawned)
+    assert server.terminated
+    assert proc._whisper_server is None
+    assert len(_cli_runs(spawned)) == 1
+
+
+def test_server_is_reused_and_restarted_for_another_model(server_up, spawned):
+    proc = AudioProcessor()
+    tiny, small = str(server_up / "models" / "tiny.bin"), str(server_up / "models" / "small.bin")
+    url = proc._whisper_server_url(str(server_up), tiny)
+    assert proc._whisper_server_url(str(server_up), tiny) == url
+    assert len(_servers(spawned)) == 1
+
+    proc._whisper_server_url(str(server_up), small)
+    first, second = _servers(spawned)
+    assert first.terminated and not second.terminated
+
+
+def test_exit_hook_is_registered_once(server_up, spawned, monkeypatch):
+    hooks = []
+    monkeypatch.setattr(processor_module.atexit, "register", hooks.append)
+    proc = AudioProcessor()
+    for model in ("tiny.bin", "small.bin", "tiny.bin"):
+        proc._whisper_server_url(str(server_up), str(server_up / "models" / model))
+    assert len(_servers(spawned)) == 3
+    assert hooks == [proc._stop_whisper_server]
+
+    # At exit the hook stops whichever server is still running
+    hooks[0]()
+    assert all(server.terminated for server in _servers(spawned))
+    assert proc._whisper_server is None
@@ -0,0 +1,131 @@
+import asyncio
+import os
+import stat
+import threading
+import time
+
+import orjson
+import pytest
+import typer
+
+from podcast_ads import main
+
+
+@pytest.fixture
+def media_dir(tmp_path):
+    media = tmp_path / "media"
+    media.mkdir()
+    for name in ("a.mp3", "b.mp3", "notes.txt"):
+        (media / name).touch()
+    return media
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return str(tmp_path / "serve.sock")
+
+
+class FakePipeline:
+    """Stands in for _process_single_item_logic, tracking items in flight."""
+
+    def __init__(self, fail_on=()):
+        self.fail_on = fail_on
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = []
+
+    def __call__(self, current_input_target, **item_options):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.calls.append((current_input_target, item_options))
+        try:
+            time.sleep(0.05)
+            if os.path.basename(current_input_target) in self.fail_on:
+                raise RuntimeError("boom")
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+async def _submit(socket_path, job):
+    reader, writer = await asyncio.open_unix_connection(socket_path)
+    writer.write(orjson.dumps(job) + b"\n")
+    await writer.drain()
+    reply = orjson.loads(await reader.readline())
+    writer.close()
+    await writer.wait_closed()
+    return reply
+
+
+async def _with_server(socket_path, concurrency, client):
+    server = asyncio.create_task(main._serve(socket_path, {"ai": None, "processor": None}, concurrency))
+    while not os.path.exists(socket_path):
+        await asyncio.sleep(0.01)
+    try:
+        return await client()
+    finally:
+        server.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await server
+
+
+def test_serve_runs_job_and_replies(monkeypatch, media_dir, socket_path, tmp_path):
+    pipeline = FakePipeline(fail_on={"b.mp3"})
+    monkeypatch.setattr(main, "_process_single_item_logic", pipeline)
+    out_dir = tmp_path / "out"
+    job = {"input": str(media_dir), "output_dir": str(out_dir), "save_subs": True, "play": True}
+
+    reply = asyncio.run(_with_server(socket_path, 2, lambda: _submit(socket_path, job)))
+
+    assert reply == {"processed": 1, "failed": 1}
+    assert out_dir.is_dir()
+    assert sorted(os.path.basename(target) for target, _ in pipeline.calls) == ["a.mp3", "b.mp3"]
+    options = pipeline.calls[0][1]
+    assert options["save_subs"] is True and options["dry_run"] is False
+    # Playback is never taken from the job
+    assert options["play"] is False
+
+
+def test_serve_reports_bad_jobs(monkeypatch, socket_path, tmp_path):
+    monkeypatch.setattr(main, "_process_single_item_logic", FakePipeline())
+
+    async def client():
+        missing = await _submit(socket_path, {"input": str(tmp_path / "missing.mp3")})
+        no_input = await _submit(socket_path, {"output_dir": str(tmp_path)})
+        return missing, no_input
+
+    missing, no_input = asyncio.run(_with_server(socket_path, 1, client))
+    assert "not found" in missing["error"]
+    assert no_input == {"error": "'input'"}
+
+
+def test_serve_shares_concurrency_across_jobs(monkeypatch, media_dir, socket_path, tmp_path):
+    pipeline = FakePipeline()
+    monkeypatch.setattr(main, "_process_single_item_logic", pipeline)
+    job = {"input": str(media_dir), "output_dir": str(tmp_path / "out")}
+
+    async def client():
+        return await asyncio.gather(*(_submit(socket_path, job) for _ in range(3)))
+
+    replies = asyncio.run(_with_server(socket_path, 1, client))
+    assert replies == [{"processed": 2, "failed": 0}] * 3
+    assert pipeline.max_in_flight == 1
+
+
+def test_serve_socket_is_owner_only(monkeypatch, socket_path):
+    monkeypatch.setattr(main, "_process_single_item_logic", FakePipeline())
+
+    async def client():
+        return stat.S_IMODE(os.stat(socket_path).st_mode)
+
+    assert asyncio.run(_with_server(socket_path, 1, client)) == 0o600
+
+
+def test_run_server_refuses_to_replace_non_socket(tmp_path):
+    path = tmp_path / "important.txt"
+    path.write_text("keep me")
+    with pytest.raises(typer.Exit):
+        main._run_server(str(path), "key", "tiny", None, 1)
+    assert path.read_text() == "keep me"
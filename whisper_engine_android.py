@@ -80,6 +80,12 @@ class WhisperTranscriber:
                 stdout=subprocess.PIPE,
                 stderr=subprocess.DEVNULL
             )
+            # Bigger kernel pipe buffer (64 KiB -> 1 MiB) for the PCM stream; best effort
+            try:
+                import fcntl
+                fcntl.fcntl(ffmpeg_proc.stdout.fileno(), fcntl.F_SETPIPE_SZ, 1 << 20)
+            except (ImportError, AttributeError, OSError):
+                pass
 
             # 2. Start Whisper (fed by FFmpeg)
             whisper_proc = subprocess.Popen(